@@ -1,108 +1,106 @@
 import requests
-import cv2
-from PIL import Image, ImageTk
-from image_utils import display_image as display_image_util
-import base64
-import tempfile
+from image_utils import encode_jpeg
+from camera import CameraCapture, StageStats
+from motion import MotionGate
+import json
 import os
-import threading
 import time
-from tkinter import messagebox
+from tkinter import filedialog, messagebox
 import tkinter as tk
 
 SERVER_URL = "http://localhost:5000"
-MAX_WIDTH = 800
-MAX_HEIGHT = 400
 PAUSE_SECONDS = 15
+JPEG_QUALITY = 90
+FIRST_FRAME_TIMEOUT = 3
+# Auto mode: how often the motion gate looks at a frame, and the burst sent on motion
+GATE_INTERVAL = 0.2
+BURST_SIZE = 3
+BURST_INTERVAL = 0.05
+# Journal tab: events per /timeline page
+LOG_PAGE_SIZE = 100
+# Local copy of the allowlist, kept current with /plates/changes deltas
+PLATES_CACHE_PATH = "plates_cache.json"
+PLATE_FILE_TYPES = [("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("Усі файли", "*.*")]
+# Row errors shown after an import
+IMPORT_ERRORS_SHOWN = 10
 
-def encode_image_to_base64(image_path):
-    with open(image_path, "rb") as img_file:
-        return base64.b64encode(img_file.read()).decode('utf-8')
-
-def resize_image_to_fit(image, max_width=MAX_WIDTH, max_height=MAX_HEIGHT):
-    h, w = image.shape[:2]
-    scale = min(max_width / w, max_height / h)
-    if scale < 1:
-        image = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
-    return image
-
-def send_frame_to_server(frame, gui):
-    gui.display_image(frame)
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-        tmp_path = tmp.name
-        cv2.imwrite(tmp_path, frame)
-    encoded_image = encode_image_to_base64(tmp_path)
-    os.unlink(tmp_path)
-    response = requests.post(f"{SERVER_URL}/recognize", json={'image': encoded_image})
-    if response.status_code == 200:
-        plates = response.json().get("plates", [])
-        matched = response.json().get("matched", plates)
-        status = response.json().get("status", "")
-        barrier_raised = response.json().get("barrier_raised", False)
-        
-        if matched:
-            is_allowed = "дозволений" in status
-            color = "green" if is_allowed else "red"
-            gui.result_label.config(text=f"{', '.join(matched)} ({status})", fg=color)
-            if is_allowed:
-                gui.pause_after_allowed = True
-                # Update barrier status in GUI
-                gui.update_barrier_status()
-        else:
-            gui.result_label.config(text="❌ Номер не знайдено", fg="red")
-    else:
-        gui.result_label.config(text="[ERROR] Сервер не відповідає", fg="red")
+_camera = None
+# Client-side timings of the recognition round-trip (encode, upload)
+request_stats = StageStats()
+motion_gate = MotionGate()
+_plate_cache = None
 
-def capture_and_send_once(gui):
-    cap = cv2.VideoCapture(1)
-    if not cap.isOpened():
-        gui.result_label.config(text="[ERROR] Не вдалося відкрити камеру", fg="red")
-        return
-    ret, frame = cap.read()
-    cap.release()
-    if not ret:
-        gui.result_label.config(text="[ERROR] Не вдалося зчитати кадр", fg="red")
-        return
-    send_frame_to_server(frame, gui)
-
-def auto_capture_loop(gui):
-    while gui.auto_mode:
-        capture_and_send_once(gui)
-        if getattr(gui, 'pause_after_allowed', False):
-            for i in range(PAUSE_SECONDS, 0, -1):
-                gui.result_label.config(text=f"Пауза: {i} с", fg="orange")
-                time.sleep(1)
-            # Lower the barrier after pause ends
-            set_barrier_status("lowered")
-            gui.update_barrier_status()
-            gui.pause_after_allowed = False
-            gui.result_label.config(text="Шлагбаум опущено", fg="blue")
-            time.sleep(1)  # Small delay before next scan
-        time.sleep(1)
-
-def toggle_mode(gui):
-    gui.auto_mode = not getattr(gui, 'auto_mode', False)
-    if gui.auto_mode:
-        gui.button_capture.config(state=tk.DISABLED)
-        gui.button_mode.config(text="Режим: Авто (натисни для ручного)")
-        gui.capture_thread = threading.Thread(target=auto_capture_loop, args=(gui,), daemon=True)
-        gui.capture_thread.start()
-    else:
-        gui.button_capture.config(state=tk.NORMAL)
-        gui.button_mode.config(text="Режим: Ручний (натисни для авто)")
+def post_frame(frame, response_mode="boxes", session=requests):
+    # Raw JPEG body: no temp file and no base64 inflation
+    start = time.perf_counter()
+    body = encode_jpeg(frame, JPEG_QUALITY)
+    encoded = time.perf_counter()
+    request_stats.record('encode', (encoded - start) * 1000)
+    response = session.post(f"{SERVER_URL}/recognize", params={'response': response_mode},
+                            data=body, headers={'Content-Type': 'image/jpeg'})
+    request_stats.record('upload', (time.perf_counter() - encoded) * 1000)
+    return response
+
+def capture_burst(size=BURST_SIZE, interval=BURST_INTERVAL):
+    frames = []
+    for i in range(size):
+        if i:
+            time.sleep(interval)
+        frame = get_camera_frame()
+        if frame is not None:
+            frames.append(frame)
+    return frames
 
 def open_barrier(gui):
     messagebox.showinfo("Шлагбаум", "🚗 Шлагбаум відкрито вручну!")
 
-def update_plate_list(gui):
-    res = requests.get(f"{SERVER_URL}/list_plates")
-    if res.status_code == 200:
-        plates = res.json().get("plates", [])
-        gui.plate_list.delete(0, tk.END)
-        for plate in sorted(plates):
-            gui.plate_list.insert(tk.END, plate)
+def load_plate_cache(path=PLATES_CACHE_PATH):
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return {'version': int(data['version']), 'plates': set(data['plates'])}
+    except (OSError, ValueError, KeyError, TypeError):
+        return {'version': 0, 'plates': set()}
+
+def save_plate_cache(cache, path=PLATES_CACHE_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({'version': cache['version'], 'plates': sorted(cache['plates'])}, f)
+    os.replace(tmp, path)
+
+def sync_plate_cache():
+    # Fetches only what changed since the cached version; 304 if nothing did
+    global _plate_cache
+    if _plate_cache is None:
+        _plate_cache = load_plate_cache()
+    cache = _plate_cache
+    res = requests.get(f"{SERVER_URL}/plates/changes", params={'since': cache['version']},
+                       headers={'If-None-Match': f'"plates-{cache["version"]}"'})
+    if res.status_code == 304:
+        return cache
+    res.raise_for_status()
+    data = res.json()
+    if data['reset']:
+        cache['plates'] = set(data['plates'])
     else:
+        for change in data['changes']:
+            if change['op'] == 'add':
+                cache['plates'].add(change['plate'])
+            else:
+                cache['plates'].discard(change['plate'])
+    cache['version'] = data['version']
+    save_plate_cache(cache)
+    return cache
+
+def update_plate_list(gui):
+    try:
+        cache = sync_plate_cache()
+    except (requests.RequestException, ValueError, KeyError):
         messagebox.showerror("Помилка", "Не вдалося отримати список номерів")
+        return
+    gui.plate_list.delete(0, tk.END)
+    for plate in sorted(cache['plates']):
+        gui.plate_list.insert(tk.END, plate)
 
 def add_plate(gui):
     plate = gui.plate_entry.get().strip().upper()
@@ -128,40 +126,73 @@ def delete_plate(gui):
     else:
         messagebox.showerror("Помилка", res.json().get("error", "Невідома помилка"))
 
-def load_access_log(gui):
-    gui.log_output.delete(1.0, tk.END)
-    
-    # Load both logs
-    access_log = []
-    barrier_log = []
-    
-    # Load access log
-    res = requests.get(f"{SERVER_URL}/log")
-    if res.status_code == 200:
-        log_data = res.json().get("log", [])
-        for plate, status, timestamp in log_data:
-            access_log.append((timestamp, plate, status))
-    else:
-        gui.log_output.insert(tk.END, "[ERROR] Не вдалося отримати лог доступу\n")
-    
-    # Load barrier log
-    res = requests.get(f"{SERVER_URL}/barrier_log")
+def _plate_file_format(path):
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+def import_plates(gui, replace=False):
+    path = filedialog.askopenfilename(title="Імпорт номерів", filetypes=PLATE_FILE_TYPES)
+    if not path:
+        return
+    if replace and not messagebox.askyesno(
+            "Замінити список", "Усі номери, яких немає у файлі, буде видалено. Продовжити?"):
+        return
+    fmt = _plate_file_format(path)
+    # The file object is streamed as the request body
+    with open(path, "rb") as f:
+        res = requests.post(f"{SERVER_URL}/plates/import",
+                            params={'format': fmt, 'mode': "replace" if replace else "merge"},
+                            data=f, headers={'Content-Type': "text/csv" if fmt == "csv" else "application/x-ndjson"})
+    data = res.json()
+    errors = "\n".join(f"Рядок {e['line']}: {e['error']}" for e in data.get("errors", [])[:IMPORT_ERRORS_SHOWN])
     if res.status_code == 200:
-        barrier_data = res.json().get("log", [])
-        for status, timestamp in barrier_data:
-            status_text = "🔓 Шлагбаум піднято" if status == "raised" else "🔒 Шлагбаум опущено"
-            barrier_log.append((timestamp, "-"*10, status_text))
+        summary = (f"Додано: {data['added']}, видалено: {data['removed']}, "
+                   f"без змін: {data['unchanged']}, помилок: {data['error_count']}")
+        messagebox.showinfo("Імпорт", summary + ("\n\n" + errors if errors else ""))
+        update_plate_list(gui)
     else:
-        gui.log_output.insert(tk.END, "[ERROR] Не вдалося отримати лог шлагбауму\n")
-    
-    # Combine and sort all logs by timestamp
-    all_logs = access_log + barrier_log
-    all_logs.sort(key=lambda x: x[0], reverse=True)  # Sort by timestamp in descending order
-    
-    # Display sorted logs
-    for timestamp, plate, status in all_logs:
-        line = f"{timestamp} | {plate:<10} | {status}\n"
-        gui.log_output.insert(tk.END, line)
+        messagebox.showerror("Помилка", data.get("error", "Невідома помилка") + ("\n\n" + errors if errors else ""))
+
+def export_plates(gui):
+    path = filedialog.asksaveasfilename(title="Експорт номерів", defaultextension=".csv",
+                                        filetypes=PLATE_FILE_TYPES, initialfile="plates.csv")
+    if not path:
+        return
+    try:
+        with requests.get(f"{SERVER_URL}/plates/export", params={'format': _plate_file_format(path)},
+                          stream=True) as res:
+            res.raise_for_status()
+            with open(path, "wb") as f:
+                for chunk in res.iter_content(chunk_size=65536):
+                    f.write(chunk)
+    except (requests.RequestException, OSError) as e:
+        messagebox.showerror("Помилка", f"Не вдалося експортувати номери: {e}")
+        return
+    messagebox.showinfo("Експорт", f"Збережено: {path}")
+
+def load_access_log(gui, more=False):
+    # One /timeline page (access and barrier events, newest first); more=True appends the next page
+    if not more:
+        gui.log_output.delete(1.0, tk.END)
+        gui.log_cursor = None
+    elif not gui.log_cursor:
+        return
+    params = {'limit': LOG_PAGE_SIZE}
+    if more:
+        params['cursor'] = gui.log_cursor
+    res = requests.get(f"{SERVER_URL}/timeline", params=params)
+    if res.status_code != 200:
+        gui.log_output.insert(tk.END, "[ERROR] Не вдалося отримати журнал\n")
+        return
+    data = res.json()
+    for event in data.get("log", []):
+        if event['kind'] == 'barrier':
+            plate = "-" * 10
+            status = "🔓 Шлагбаум піднято" if event['status'] == "raised" else "🔒 Шлагбаум опущено"
+        else:
+            plate, status = event['plate'], event['status']
+        gui.log_output.insert(tk.END, f"{event['timestamp']} | {plate:<10} | {status}\n")
+    gui.log_cursor = data.get("next_cursor")
+    gui.button_log_more.config(state=tk.NORMAL if gui.log_cursor else tk.DISABLED)
 
 def get_barrier_status():
     try:
@@ -181,12 +212,25 @@ def set_barrier_status(state):
         pass
     return state
 
+def get_camera():
+    global _camera
+    if _camera is None:
+        _camera = CameraCapture()
+        _camera.start()
+    return _camera
+
 def get_camera_frame():
-    cap = cv2.VideoCapture(1)
-    if not cap.isOpened():
-        return None
-    ret, frame = cap.read()
-    cap.release()
-    if not ret:
-        return None
-    return frame 
\ No newline at end of file
+    # Newest buffered frame; only the very first call waits for the device to open
+    return get_camera().latest(wait=FIRST_FRAME_TIMEOUT)
+
+def release_camera():
+    global _camera
+    if _camera is not None:
+        _camera.stop()
+        _camera = None
+
+def camera_stats():
+    stats = get_camera().summary()
+    stats['stages'].update(request_stats.snapshot())
+    stats['gate'] = motion_gate.counters()
+    return stats 
\ No newline at end of file
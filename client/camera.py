@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import deque
+import cv2
+
+CAMERA_INDEX = 1
+BUFFER_SIZE = 4
+RECONNECT_DELAY = 1.0
+MAX_FAILED_READS = 5
+
+
+class StageStats:
+    """Running count/avg/max of per-stage durations in milliseconds."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def record(self, stage, ms):
+        with self._lock:
+            count, total, peak = self._stages.get(stage, (0, 0.0, 0.0))
+            self._stages[stage] = (count + 1, total + ms, max(peak, ms))
+
+    def snapshot(self):
+        with self._lock:
+            return {stage: {'count': count, 'avg_ms': total / count, 'max_ms': peak}
+                    for stage, (count, total, peak) in self._stages.items()}
+
+
+class CameraCapture:
+    """Keeps the camera open and holds the most recent frames.
+
+    A background thread reads continuously, so auto-exposure stays settled
+    and callers get the newest frame without waiting for the device.
+    """
+
+    def __init__(self, index=CAMERA_INDEX, buffer_size=BUFFER_SIZE):
+        self.index = index
+        self.stats = StageStats()
+        self._frames = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+        self._running = False
+        self._thread = None
+        self.reconnects = 0
+        self.frames_read = 0
+        self.started_at = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="camera", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _open(self):
+        start = time.perf_counter()
+        cap = cv2.VideoCapture(self.index)
+        self.stats.record('open', (time.perf_counter() - start) * 1000)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        return cap
+
+    def _run(self):
+        cap = None
+        failed = 0
+        while self._running:
+            if cap is None:
+                cap = self._open()
+                if cap is None:
+                    time.sleep(RECONNECT_DELAY)
+                    continue
+            start = time.perf_counter()
+            ret, frame = cap.read()
+            if not ret:
+                failed += 1
+                if failed >= MAX_FAILED_READS:
+                    # Device unplugged or stuck: drop it and reopen
+                    cap.release()
+                    cap = None
+                    failed = 0
+                    self.reconnects += 1
+                    time.sleep(RECONNECT_DELAY)
+                continue
+            failed = 0
+            self.stats.record('read', (time.perf_counter() - start) * 1000)
+            with self._new_frame:
+                self._frames.append((time.monotonic(), frame))
+                self.frames_read += 1
+                self._new_frame.notify_all()
+        if cap is not None:
+            cap.release()
+
+    def latest(self, wait=0):
+        # Newest frame, or None; waits up to `wait` seconds if the buffer is still empty
+        with self._new_frame:
+            if not self._frames and wait > 0:
+                self._new_frame.wait_for(lambda: self._frames, timeout=wait)
+            if not self._frames:
+                return None
+            return self._frames[-1][1].copy()
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0
+        with self._lock:
+            age = time.monotonic() - self._frames[-1][0] if self._frames else None
+        return {
+            'fps': self.frames_read / elapsed if elapsed else 0.0,
+            'frames': self.frames_read,
+            'reconnects': self.reconnects,
+            'frame_age_ms': age * 1000 if age is not None else None,
+            'stages': self.stats.snapshot(),
+        }
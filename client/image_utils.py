@@ -1,15 +1,30 @@
 import cv2
-import base64
-import tempfile
-import os
 from PIL import Image, ImageTk
 
 MAX_WIDTH = 800
 MAX_HEIGHT = 400
 
-def encode_image_to_base64(image_path):
-    with open(image_path, "rb") as img_file:
-        return base64.b64encode(img_file.read()).decode('utf-8')
+def encode_jpeg(image, quality=90):
+    ok, buf = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Failed to encode frame")
+    return buf.tobytes()
+
+def draw_boxes(image, boxes):
+    # Boxes as returned by /recognize with response=boxes
+    for box in boxes:
+        cv2.rectangle(image, (box['x1'], box['y1']), (box['x2'], box['y2']), (0, 255, 0), 2)
+    return image
+
+def downscale_gray(image, width=160):
+    h, w = image.shape[:2]
+    scale = width / w
+    small = cv2.resize(image, (width, max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+def sharpness(image, width=320):
+    # Variance of the Laplacian: higher means more in-focus edges
+    return cv2.Laplacian(downscale_gray(image, width), cv2.CV_64F).var()
 
 def resize_image_to_fit(image, max_width=MAX_WIDTH, max_height=MAX_HEIGHT):
     h, w = image.shape[:2]
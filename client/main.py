@@ -1,18 +1,10 @@
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
-from PIL import Image, ImageTk
-from image_utils import display_image as display_image_util
+from tkinter import ttk, scrolledtext
+from image_utils import display_image as display_image_util, draw_boxes
 import api
-import time
-import tempfile
-import os
-import requests
-import cv2
-import threading
-import base64
-import numpy as np
+from pipeline import RecognitionPipeline
 
-PAUSE_SECONDS = 15  
+STATS_REFRESH_MS = 2000
 
 class PlateRecognitionApp:
     def __init__(self, root):
@@ -58,6 +50,9 @@ class PlateRecognitionApp:
         self.result_label = tk.Label(self.frame_right, text="", font=("Arial", 16))
         self.result_label.pack(pady=10)
 
+        self.camera_stats_label = tk.Label(self.frame_right, text="", font=("Courier", 9), fg="gray")
+        self.camera_stats_label.pack(pady=5)
+
         # TAB 2: База номерів
         self.tab_db = tk.Frame(self.notebook)
         self.notebook.add(self.tab_db, text="База дозволених номерів")
@@ -74,6 +69,9 @@ class PlateRecognitionApp:
 
         tk.Button(self.frame_db, text="Додати", command=self.add_plate).grid(row=0, column=2, padx=5)
         tk.Button(self.frame_db, text="Видалити обраний", command=self.delete_plate).grid(row=0, column=3, padx=5)
+        tk.Button(self.frame_db, text="Імпорт", command=self.import_plates).grid(row=0, column=4, padx=5)
+        tk.Button(self.frame_db, text="Замінити все", command=self.replace_plates).grid(row=0, column=5, padx=5)
+        tk.Button(self.frame_db, text="Експорт", command=self.export_plates).grid(row=0, column=6, padx=5)
 
         # TAB 3: Журнал доступу
         self.tab_log = tk.Frame(self.notebook)
@@ -81,8 +79,35 @@ class PlateRecognitionApp:
 
         self.log_output = scrolledtext.ScrolledText(self.tab_log, height=25, width=100, font=("Courier", 10))
         self.log_output.pack(padx=10, pady=10)
+        self.log_cursor = None
+
+        self.button_log_more = tk.Button(self.tab_log, text="Показати ще", state=tk.DISABLED,
+                                         command=self.load_more_log)
+        self.button_log_more.pack(pady=5)
 
         self.update_barrier_status()
+        self.update_camera_stats()
+
+    def update_camera_stats(self):
+        stats = api.camera_stats()
+        stages = stats['stages']
+        parts = [f"{stats['fps']:.1f} fps", f"reconnects {stats['reconnects']}",
+                 f"sent {stats['gate']['sent']} / skipped {stats['gate']['skipped']}"]
+        for stage in ('read', 'encode', 'upload'):
+            if stage in stages:
+                parts.append(f"{stage} {stages[stage]['avg_ms']:.0f} ms")
+        if getattr(self, 'auto_mode', False):
+            dropped = self.pipeline.stats()
+            parts.append(f"dropped {dropped['dropped_frames']}/{dropped['dropped_results']}")
+        self.camera_stats_label.config(text=" | ".join(parts))
+        self.root.after(STATS_REFRESH_MS, self.update_camera_stats)
+
+    def on_close(self):
+        if getattr(self, 'auto_mode', False):
+            self.auto_mode = False
+            self.pipeline.stop()
+        api.release_camera()
+        self.root.destroy()
 
     def bind_events(self):
         self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
@@ -99,48 +124,58 @@ class PlateRecognitionApp:
     def display_image(self, image):
         display_image_util(image, self.label_image)
 
-    def send_frame_to_server(self, frame):
-        api.display_image_util(frame, self.label_image)
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-            tmp_path = tmp.name
-            cv2.imwrite(tmp_path, frame)
-        encoded_image = api.encode_image_to_base64(tmp_path)
-        os.unlink(tmp_path)
-        response = requests.post(f"{api.SERVER_URL}/recognize", json={'image': encoded_image})
+    def show_response(self, frame, response):
         allowed = False
-        if response.status_code == 200:
+        if response is not None and response.status_code == 200:
             plates = response.json().get("plates", [])
             matched = response.json().get("matched", plates)
             status = response.json().get("status", "")
-            boxed_image_b64 = response.json().get("boxed_image")
-            if boxed_image_b64:
-                img_bytes = base64.b64decode(boxed_image_b64)
-                img_array = np.frombuffer(img_bytes, np.uint8)
-                img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-                display_image_util(img, self.label_image)
+            boxes = response.json().get("boxes")
+            if boxes:
+                # The server only sends coordinates, draw them on the frame we already have
+                display_image_util(draw_boxes(frame.copy(), boxes), self.label_image)
+            else:
+                display_image_util(frame, self.label_image)
             if matched:
                 is_allowed = "дозволений" in status
                 color = "green" if is_allowed else "red"
                 self.result_label.config(text=f"{', '.join(matched)} ({status})", fg=color)
                 allowed = is_allowed
-                if allowed:
-                    self.update_barrier_status()
+                if response.json().get("barrier_raised"):
+                    self.show_barrier_status("raised")
             else:
                 self.result_label.config(text="❌ Номер не знайдено", fg="red")
         else:
+            display_image_util(frame, self.label_image)
             self.result_label.config(text="Проблема з визначенням номера", fg="red")
         return allowed
 
-    def capture_and_send_once(self, auto=False):
+    def send_frame_to_server(self, frame):
+        return self.show_response(frame, api.post_frame(frame))
+
+    def capture_and_send_once(self):
         self.display_scanning()
         frame = api.get_camera_frame()
         if frame is not None:
-            self.send_frame_to_server(frame)
+            # The server decides on several agreeing reads, so one press sends a short burst
+            frames = [frame] + api.capture_burst(api.BURST_SIZE - 1)
+            for burst_frame in frames[:-1]:
+                api.post_frame(burst_frame, response_mode="decision")
+            self.send_frame_to_server(frames[-1])
         else:
             self.result_label.config(text="[ERROR] Не вдалося зчитати кадр", fg="red")
 
     def toggle_mode(self):
-        api.toggle_mode(self)
+        self.auto_mode = not getattr(self, 'auto_mode', False)
+        if self.auto_mode:
+            self.button_capture.config(state=tk.DISABLED)
+            self.button_mode.config(text="Режим: Авто (натисни для ручного)")
+            self.pipeline = RecognitionPipeline(self)
+            self.pipeline.start()
+        else:
+            self.button_capture.config(state=tk.NORMAL)
+            self.button_mode.config(text="Режим: Ручний (натисни для авто)")
+            self.pipeline.stop()
 
     def toggle_barrier(self):
         current_status = api.get_barrier_status()
@@ -157,11 +192,25 @@ class PlateRecognitionApp:
     def delete_plate(self):
         api.delete_plate(self)
 
+    def import_plates(self):
+        api.import_plates(self)
+
+    def replace_plates(self):
+        api.import_plates(self, replace=True)
+
+    def export_plates(self):
+        api.export_plates(self)
+
     def load_access_log(self):
         api.load_access_log(self)
 
+    def load_more_log(self):
+        api.load_access_log(self, more=True)
+
     def update_barrier_status(self):
-        status = api.get_barrier_status()
+        self.show_barrier_status(api.get_barrier_status())
+
+    def show_barrier_status(self, status):
         if status == "raised":
             self.barrier_status_label.config(text="🔓 Шлагбаум піднятий", fg="green")
             self.button_barrier.config(text="🛑 Опустити шлагбаум")
@@ -169,43 +218,6 @@ class PlateRecognitionApp:
             self.barrier_status_label.config(text="🔒 Шлагбаум опущений", fg="red")
             self.button_barrier.config(text="🛑 Відкрити шлагбаум")
 
-    def start_pause(self, seconds=PAUSE_SECONDS):
-        if getattr(self, 'pause_active', False):
-            return  # Do not start another pause if already active
-        self.pause_active = True
-        # Set barrier to raised on server
-        api.set_barrier_status('raised')
-        # Wait a short moment and update GUI to reflect new barrier status
-        self.root.after(200, self.update_barrier_status)
-        def pause_loop():
-            for i in range(seconds, 0, -1):
-                if not self.pause_active:
-                    break
-                self.result_label.config(text=f"Пауза: {i} с", fg="orange")
-                self.root.update()
-                time.sleep(1)
-            self.pause_active = False
-            self.result_label.config(text="Пауза завершена", fg="green")
-            # Restore real barrier status after pause
-            self.update_barrier_status()
-        threading.Thread(target=pause_loop, daemon=True).start()
-
-
-    def auto_capture_loop(self):
-        while getattr(self, 'auto_mode', False):
-            if getattr(self, 'pause_active', False):
-                time.sleep(0.2)
-                continue
-            self.display_scanning()
-            frame = api.get_camera_frame()
-            if frame is not None:
-                allowed = self.send_frame_to_server(frame)
-                if allowed:
-                    self.start_pause()
-            else:
-                self.result_label.config(text="[ERROR] Не вдалося зчитати кадр", fg="red")
-            time.sleep(1)
-
     def display_scanning(self):
         self.result_label.config(text="Скануємо кадр...", fg="blue")
         self.root.update()
@@ -213,4 +225,5 @@ class PlateRecognitionApp:
 if __name__ == "__main__":
     root = tk.Tk()
     app = PlateRecognitionApp(root)
+    root.protocol("WM_DELETE_WINDOW", app.on_close)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,64 @@
+import threading
+import cv2
+from image_utils import downscale_gray, sharpness
+
+# Fraction of the frame the largest changed region must cover to count as a vehicle
+MOTION_THRESHOLD = 0.02
+# Per-pixel grey-level difference from the background that counts as change
+PIXEL_THRESHOLD = 25
+# Background adaptation rate; a parked car fades into the background in ~1/alpha checks
+BACKGROUND_ALPHA = 0.05
+GATE_WIDTH = 160
+
+
+class MotionGate:
+    """Cheap client-side filter deciding which frames are worth a /recognize call.
+
+    Frames are compared on a small blurred greyscale copy against a running
+    average background; only a changed region of vehicle size lets a frame
+    through. Counters track how many frames were sent and skipped.
+    """
+
+    def __init__(self, threshold=MOTION_THRESHOLD, pixel_threshold=PIXEL_THRESHOLD,
+                 alpha=BACKGROUND_ALPHA, width=GATE_WIDTH):
+        self.threshold = threshold
+        self.pixel_threshold = pixel_threshold
+        self.alpha = alpha
+        self.width = width
+        self._background = None
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.skipped = 0
+
+    def _changed_fraction(self, frame):
+        gray = cv2.GaussianBlur(downscale_gray(frame, self.width), (5, 5), 0)
+        if self._background is None or self._background.shape != gray.shape:
+            self._background = gray.astype('float32')
+            return 1.0
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+        cv2.accumulateWeighted(gray, self._background, self.alpha)
+        _, mask = cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)
+        mask = cv2.dilate(mask, None, iterations=2)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return 0.0
+        largest = max(cv2.contourArea(c) for c in contours)
+        return largest / (gray.shape[0] * gray.shape[1])
+
+    def check(self, frame):
+        with self._lock:
+            moving = self._changed_fraction(frame) >= self.threshold
+            if moving:
+                self.sent += 1
+            else:
+                self.skipped += 1
+            return moving
+
+    def counters(self):
+        with self._lock:
+            return {'sent': self.sent, 'skipped': self.skipped}
+
+
+def best_frame(frames):
+    # Sharpest frame of a burst, so motion blur does not reach the OCR
+    return max(frames, key=sharpness) if frames else None
@@ -0,0 +1,166 @@
+import itertools
+import queue
+import threading
+import time
+import requests
+import api
+from motion import best_frame
+
+FRAME_QUEUE_SIZE = 2
+RESULT_QUEUE_SIZE = 4
+UPLOAD_WORKERS = 2
+UI_POLL_MS = 50
+# Frame slot of the result-queue item that reports the barrier coming down after a pause
+BARRIER_LOWERED = object()
+
+
+class DropOldestQueue:
+    """Bounded queue whose producers never block: when full, the oldest item goes."""
+
+    def __init__(self, maxsize):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def put(self, item):
+        with self._lock:
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+
+    def get(self, timeout=None):
+        return self._queue.get(timeout=timeout)
+
+    def get_nowait(self):
+        return self._queue.get_nowait()
+
+
+class RecognitionPipeline:
+    """Auto mode as three overlapping stages joined by bounded queues.
+
+    capture: camera buffer -> motion gate -> sharpest frame of a burst
+    upload:  a few workers, each with a keep-alive requests.Session
+    ui:      drained on the Tk thread via root.after, newest result wins
+
+    While the server works on one frame the next one is already being
+    captured and encoded, so the frame rate is no longer the sum of stages.
+    """
+
+    def __init__(self, gui, upload_workers=UPLOAD_WORKERS):
+        self.gui = gui
+        self.upload_workers = upload_workers
+        self.frames = DropOldestQueue(FRAME_QUEUE_SIZE)
+        self.results = DropOldestQueue(RESULT_QUEUE_SIZE)
+        self._running = threading.Event()
+        # Set while the barrier is up after an allowed plate; capture stands still
+        self._paused = threading.Event()
+        self._sequence = itertools.count()
+        self._last_shown = -1
+        self._threads = []
+        self._poll_id = None
+
+    def start(self):
+        self._running.set()
+        self._threads = [threading.Thread(target=self._capture, name="capture", daemon=True)]
+        for i in range(self.upload_workers):
+            self._threads.append(threading.Thread(target=self._upload, name=f"upload-{i}", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        self._poll_id = self.gui.root.after(UI_POLL_MS, self._drain_results)
+
+    def stop(self):
+        self._running.clear()
+        # During a pause the UI keeps polling until the barrier-lowered item arrives
+        if self._poll_id is not None and not self._paused.is_set():
+            self.gui.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._threads = []
+
+    def stats(self):
+        return {'dropped_frames': self.frames.dropped, 'dropped_results': self.results.dropped}
+
+    def _capture(self):
+        while self._running.is_set():
+            if self._paused.is_set():
+                time.sleep(api.GATE_INTERVAL)
+                continue
+            frame = api.get_camera_frame()
+            if frame is None:
+                self.results.put((next(self._sequence), None, None))
+                time.sleep(1)
+                continue
+            if not api.motion_gate.check(frame):
+                time.sleep(api.GATE_INTERVAL)
+                continue
+            frame = best_frame([frame] + api.capture_burst(api.BURST_SIZE - 1))
+            self.frames.put((next(self._sequence), frame))
+
+    def _upload(self):
+        with requests.Session() as session:
+            while self._running.is_set():
+                try:
+                    seq, frame = self.frames.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                try:
+                    response = api.post_frame(frame, response_mode="boxes", session=session)
+                except requests.RequestException:
+                    response = None
+                self.results.put((seq, frame, response))
+
+    def _drain_results(self):
+        latest = None
+        while True:
+            try:
+                item = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if item[1] is BARRIER_LOWERED:
+                self._end_pause(item[2])
+            elif item[0] > self._last_shown:
+                latest = item
+        if latest is not None and self._running.is_set() and not self._paused.is_set():
+            self._last_shown, frame, response = latest
+            if frame is None:
+                self.gui.result_label.config(text="[ERROR] Не вдалося зчитати кадр", fg="red")
+            else:
+                self.gui.show_response(frame, response)
+                # Only a frame that actually raised the barrier pauses; repeat frames of the
+                # same vehicle, or ones another server worker handled, come back without it
+                if response is not None and response.ok and response.json().get("barrier_raised"):
+                    self._start_pause()
+        if self._running.is_set() or self._paused.is_set():
+            self._poll_id = self.gui.root.after(UI_POLL_MS, self._drain_results)
+        else:
+            self._poll_id = None
+
+    def _start_pause(self):
+        # show_response has already shown the barrier raised
+        self._paused.set()
+        self._countdown(api.PAUSE_SECONDS)
+
+    def _countdown(self, seconds):
+        # Runs to the end even if auto mode is switched off, so the barrier still comes down
+        if seconds > 0:
+            self.gui.result_label.config(text=f"Пауза: {seconds} с", fg="orange")
+            self.gui.root.after(1000, self._countdown, seconds - 1)
+            return
+        # Lower the barrier after pause ends, off the Tk thread
+        threading.Thread(target=self._lower_barrier, daemon=True).start()
+
+    def _lower_barrier(self):
+        status = api.set_barrier_status("lowered")
+        # Back to the Tk thread through the result queue, like every other result
+        self.results.put((next(self._sequence), BARRIER_LOWERED, status))
+
+    def _end_pause(self, status):
+        self.gui.show_barrier_status(status)
+        self.gui.result_label.config(text="Шлагбаум опущено", fg="blue")
+        self._paused.clear()
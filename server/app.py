@@ -1,14 +1,43 @@
-from flask import Flask, request, jsonify
+import atexit
+import threading
+import time
+from flask import Flask, Response, g, request, jsonify
 from db import init_db
-from recognition import recognize_plate
-from db import add_plate, delete_plate, list_plates, get_log, log_barrier_status, get_barrier_log
+from recognition import recognize_plate, pipeline_stats, pipeline_metrics, warmup, readiness
+from ocr import shutdown_ocr
+from log_writer import shutdown_log_writer
+from inference import inference_executor
+from db import add_plate, delete_plate, list_plates, get_plate_changes, import_plates, export_plates
+from db import get_log, get_barrier_log, get_timeline, clear_decisions
+from tracking import get_tracker
+from barrier import get_barrier, BARRIER_STATES
+from retention import RetentionScheduler
+from metrics import registry, observe_stage, observe_request
+from profiler import profiler
+from stages import add_observer
+import config
 
 app = Flask(__name__)
 
-# Initialize the database
-init_db()
+if config.METRICS_ENABLED:
+    add_observer(observe_stage)
+    registry.add_collector(pipeline_metrics)
 
-barrier_status = {'state': 'lowered'}
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    if profiler is not None:
+        g.profile_token = profiler.begin()
+
+@app.after_request
+def record_request(response):
+    elapsed = time.perf_counter() - g.request_start
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    if config.METRICS_ENABLED:
+        observe_request(route, request.method, response.status_code, elapsed)
+    if profiler is not None:
+        profiler.end(g.profile_token, f"{request.method} {route}", elapsed)
+    return response
 
 @app.route('/recognize', methods=['POST'])
 def recognize():
@@ -24,29 +53,90 @@ def delete():
 
 @app.route('/list_plates', methods=['GET'])
 def list_allowed():
-    return list_plates()
+    return list_plates(request)
+
+@app.route('/plates/changes', methods=['GET'])
+def plate_changes():
+    # ?since=<version>; If-None-Match with the ETag of that version returns 304
+    return get_plate_changes(request)
+
+@app.route('/plates/import', methods=['POST'])
+def plates_import():
+    # Body is CSV or JSONL (?format= or Content-Type); ?mode=merge|replace
+    return import_plates(request)
+
+@app.route('/plates/export', methods=['GET'])
+def plates_export():
+    return export_plates(request)
 
 @app.route('/log', methods=['GET'])
 def log():
-    return get_log()
+    # ?limit, ?cursor (next_cursor of the previous page), ?since, ?until, ?plate, ?status, ?lane
+    return get_log(request)
 
 @app.route('/barrier_status', methods=['GET'])
 def get_barrier_status():
-    return jsonify({'status': barrier_status['state']})
+    # Optional ?lane= for stream lanes and cameras that post with a lane name
+    return jsonify({'status': get_barrier(request.args.get('lane')).state})
 
 @app.route('/set_barrier', methods=['POST'])
 def set_barrier():
     data = request.get_json()
     state = data.get('state')
-    if state not in ['raised', 'lowered']:
+    if state not in BARRIER_STATES:
         return jsonify({'error': 'Invalid state'}), 400
-    barrier_status['state'] = state
-    log_barrier_status(state)
-    return jsonify({'status': barrier_status['state']})
+    lane = data.get('lane')
+    if state == 'lowered':
+        # Lowered by hand: a car still at the gate may be recognised and let through again
+        clear_decisions(lane)
+        get_tracker(lane).forget_decisions()
+    return jsonify({'status': get_barrier(lane).set_state(state)})
 
 @app.route('/barrier_log', methods=['GET'])
 def barrier_log():
-    return get_barrier_log()
+    return get_barrier_log(request)
+
+@app.route('/timeline', methods=['GET'])
+def timeline():
+    # Access and barrier events together, newest first; same parameters as /log
+    return get_timeline(request)
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    # 503 until the detector and OCR engines are loaded and warm
+    status = readiness()
+    return jsonify(status), 200 if status['ready'] else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    if not config.METRICS_ENABLED:
+        return jsonify({'error': 'metrics are disabled'}), 404
+    return Response(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/debug/profile', methods=['GET'])
+def debug_profile():
+    # Folded stacks of the slowest requests, for flamegraph.pl / speedscope; ?reset=1 starts over
+    if profiler is None:
+        return jsonify({'error': 'profiler is off, set PROFILE_SLOWEST'}), 404
+    folded = profiler.folded()
+    if request.args.get('reset'):
+        profiler.reset()
+    return Response(folded, content_type='text/plain; charset=utf-8')
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    return jsonify(pipeline_stats())
 
 if __name__ == '__main__':
+    init_db()
+    if config.WARMUP_ON_START:
+        # Serve right away; /ready reports when the models are warm
+        threading.Thread(target=warmup, name="warmup", daemon=True).start()
+    retention = RetentionScheduler()
+    retention.start()
+    atexit.register(retention.shutdown)
+    atexit.register(shutdown_ocr)
+    atexit.register(shutdown_log_writer)
+    # Registered last so it runs first: in-flight frames still log and read OCR
+    atexit.register(inference_executor.shutdown)
     app.run(host='0.0.0.0', port=5000) 
\ No newline at end of file
@@ -0,0 +1,46 @@
+import threading
+from db import log_barrier_status, get_barrier_state, set_barrier_state
+
+BARRIER_STATES = ('raised', 'lowered')
+
+
+class BarrierController:
+    """Barrier of one gate (or one stream lane).
+
+    The position lives in the barrier_state table, so every server worker and
+    stream process sees the same state; `state` is only the fallback until
+    the lane is first set. Every set_state call is logged, same as the
+    /set_barrier route always did.
+    """
+
+    def __init__(self, state='lowered', lane=None):
+        self.lane = lane
+        self._default = state
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        return get_barrier_state(self.lane) or self._default
+
+    def set_state(self, state):
+        if state not in BARRIER_STATES:
+            raise ValueError(f"Invalid barrier state: {state}")
+        with self._lock:
+            set_barrier_state(state, self.lane)
+            log_barrier_status(state, self.lane)
+        return state
+
+
+barrier = BarrierController()
+
+_lane_barriers = {}
+_lane_barriers_lock = threading.Lock()
+
+
+def get_barrier(lane=None):
+    if lane is None:
+        return barrier
+    with _lane_barriers_lock:
+        if lane not in _lane_barriers:
+            _lane_barriers[lane] = BarrierController(lane=lane)
+        return _lane_barriers[lane]
@@ -0,0 +1,112 @@
+"""Detector backends: parity with ultralytics and latency/throughput per backend.
+
+Run from the server/ directory after exporting the model (python detector.py):
+    python -m benchmarks.bench_detector --images frames/ [--backend onnxruntime:best_int8.onnx]
+
+Every --backend (default: all three with their default models) is compared
+with the ultralytics/best.pt reference: a reference box counts as matched
+when a backend box overlaps it with IoU >= --match-iou. Latency is measured
+per frame (batch 1) and per --batch frames, as the micro-batcher sends them.
+"""
+import argparse
+import os
+import statistics
+import time
+
+from detector import DETECTOR_BACKENDS, create_detector
+from tracking import iou
+from benchmarks.fixtures import make_gate_frame, load_image
+
+
+def synthetic_frames(count, seed=0):
+    # Gate-camera-sized frames with one plate each; real frames give a far better parity check
+    return [make_gate_frame(f"AA{1000 + i}BB", seed + i) for i in range(count)]
+
+
+def load_frames(directory, limit):
+    names = sorted(name for name in os.listdir(directory)
+                   if name.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')))[:limit]
+    return [load_image(os.path.join(directory, name)) for name in names]
+
+
+def parity(reference, detections, match_iou):
+    matched, missed, extra, conf_diffs = 0, 0, 0, []
+    for ref, dets in zip(reference, detections):
+        used = set()
+        for ref_box in ref:
+            scores = [(iou(ref_box[:4], det[:4]), j) for j, det in enumerate(dets) if j not in used]
+            best, j = max(scores, default=(0.0, None))
+            if best >= match_iou:
+                matched += 1
+                used.add(j)
+                conf_diffs.append(abs(float(ref_box[4]) - float(dets[j][4])))
+            else:
+                missed += 1
+        extra += len(dets) - len(used)
+    return matched, missed, extra, max(conf_diffs, default=0.0)
+
+
+def time_batches(detector, frames, batch, repeat):
+    samples = []
+    for _ in range(repeat):
+        for i in range(0, len(frames), batch):
+            chunk = frames[i:i + batch]
+            start = time.perf_counter()
+            detector.detect(chunk)
+            samples.append(((time.perf_counter() - start) * 1000, len(chunk)))
+    return samples
+
+
+def report(name, samples):
+    latencies = sorted(ms for ms, _ in samples)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    fps = sum(n for _, n in samples) / (sum(latencies) / 1000)
+    print(f"  {name:<8} mean {statistics.mean(latencies):8.1f} ms   "
+          f"p95 {p95:8.1f} ms   {fps:7.1f} frames/s")
+
+
+def parse_backend(spec):
+    backend, _, model = spec.partition(':')
+    if backend not in DETECTOR_BACKENDS:
+        raise SystemExit(f"--backend must be one of {', '.join(DETECTOR_BACKENDS)}")
+    return backend, model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", help="directory of gate frames (default: synthetic frames)")
+    parser.add_argument("--count", type=int, default=32, help="frames to use")
+    parser.add_argument("--backend", action="append", default=[], metavar="BACKEND[:MODEL]")
+    parser.add_argument("--input-size", type=int)
+    parser.add_argument("--threads", type=int)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--match-iou", type=float, default=0.9)
+    args = parser.parse_args()
+
+    frames = load_frames(args.images, args.count) if args.images else synthetic_frames(args.count)
+    options = {key: value for key, value in
+               (('input_size', args.input_size), ('threads', args.threads)) if value is not None}
+    backends = [parse_backend(spec) for spec in args.backend] or [(b, '') for b in DETECTOR_BACKENDS if b != 'stub']
+
+    reference = create_detector('ultralytics', **options).detect(frames)
+    print(f"{len(frames)} frames, {sum(len(r) for r in reference)} reference boxes")
+    if not any(len(r) for r in reference):
+        print("warning: the reference found no plates, parity is meaningless on these frames")
+
+    for backend, model in backends:
+        try:
+            detector = create_detector(backend, model, **options)
+        except Exception as e:
+            print(f"{backend}{':' + model if model else ''}: skipped ({e})")
+            continue
+        detector.detect(frames[:1])  # warm-up
+        matched, missed, extra, conf_diff = parity(reference, detector.detect(frames), args.match_iou)
+        print(f"{backend}{':' + model if model else ''}: matched {matched}, missed {missed}, "
+              f"extra {extra}, max conf diff {conf_diff:.3f}")
+        report("batch 1", time_batches(detector, frames, 1, args.repeat))
+        report(f"batch {args.batch}", time_batches(detector, frames, args.batch, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
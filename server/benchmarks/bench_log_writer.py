@@ -0,0 +1,74 @@
+"""Access-log throughput: one connection + commit per event (old path) vs. LogWriter.
+
+Run from the server/ directory:
+    python -m benchmarks.bench_log_writer [--events 2000]
+
+Works on a temporary database, the real allowed_plates.db is not touched.
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from log_writer import LogWriter, ACCESS_INSERT, utc_timestamp
+
+
+def create_schema(db_path, wal):
+    with sqlite3.connect(db_path) as conn:
+        if wal:
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""CREATE TABLE IF NOT EXISTS access_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            plate TEXT,
+            status TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            lane TEXT
+        )""")
+
+
+def old_log_access(db_path, plate, status):
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO access_log (plate, status) VALUES (?, ?)", (plate, status))
+        conn.commit()
+
+
+def bench_old(db_path, events):
+    create_schema(db_path, wal=False)
+    start = time.perf_counter()
+    for i in range(events):
+        old_log_access(db_path, f"AA{i % 10000:04d}BB", "пропуск заборонений")
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed
+
+
+def bench_new(db_path, events):
+    create_schema(db_path, wal=True)
+    writer = LogWriter(db_path=db_path)
+    writer.start()
+    start = time.perf_counter()
+    for i in range(events):
+        writer.write(ACCESS_INSERT, (f"AA{i % 10000:04d}BB", "пропуск заборонений", utc_timestamp(), None))
+    enqueued = time.perf_counter() - start
+    writer.shutdown()
+    return enqueued, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, bench in (("old", bench_old), ("writer", bench_new)):
+            db_path = os.path.join(tmp, f"{name}.db")
+            caller, total = bench(db_path, args.events)
+            with sqlite3.connect(db_path) as conn:
+                rows = conn.execute("SELECT COUNT(*) FROM access_log").fetchone()[0]
+            print(f"{name:<7} {args.events / total:10.0f} events/s on disk   "
+                  f"{caller / args.events * 1e6:8.1f} us/event for the caller   rows={rows}")
+
+
+if __name__ == "__main__":
+    main()
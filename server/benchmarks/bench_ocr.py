@@ -0,0 +1,63 @@
+"""Per-crop OCR latency: a fresh PaddleOCR per call (old path) vs. the warm pool.
+
+Run from the server/ directory:
+    python -m benchmarks.bench_ocr [--image crop.jpg] [--runs 20]
+"""
+import argparse
+import gc
+import statistics
+import time
+
+from ocr import OCRPool, create_ocr_model, resize_for_ocr, enhance_contrast
+from benchmarks.fixtures import make_plate_crop, load_image
+
+
+def run_ocr_per_call(processed_image):
+    ocr_model = create_ocr_model()
+    result = ocr_model.ocr(processed_image, cls=False)
+    del ocr_model
+    gc.collect()
+    return result
+
+
+def measure(fn, image, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(image)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{name:<12} mean {statistics.mean(samples):8.1f} ms   "
+          f"p50 {statistics.median(samples):8.1f} ms   p95 {p95:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--image", help="plate crop to OCR (synthetic plate by default)")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--old-runs", type=int, default=5,
+                        help="runs for the per-call path, which is much slower")
+    args = parser.parse_args()
+
+    crop = load_image(args.image) if args.image else make_plate_crop()
+    processed = enhance_contrast(resize_for_ocr(crop))
+
+    report("per-call", measure(run_ocr_per_call, processed, args.old_runs))
+
+    start = time.perf_counter()
+    pool = OCRPool(size=1)
+    pool.start()
+    print(f"pool warm-up {(time.perf_counter() - start) * 1000:.1f} ms (paid once at startup)")
+    try:
+        report("pooled", measure(pool.run, processed, args.runs))
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
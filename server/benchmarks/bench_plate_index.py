@@ -0,0 +1,81 @@
+"""Allowed-plate lookup: linear Levenshtein scan (old path) vs. PlateIndex.
+
+Run from the server/ directory:
+    python -m benchmarks.bench_plate_index [--sizes 1000 100000 1000000]
+
+The old path is timed on the in-memory list only (no SQLite round-trip),
+so its numbers are a lower bound of what is_plate_allowed used to cost.
+"""
+import argparse
+import random
+import string
+import time
+
+from db import is_fuzzy_match
+from plate_index import PlateIndex
+
+REGIONS = ["AA", "AI", "AX", "BC", "BH", "BI", "CA", "KA", "KE", "OO"]
+
+
+def random_plates(count, seed=0):
+    rng = random.Random(seed)
+    plates = set()
+    while len(plates) < count:
+        plates.add(rng.choice(REGIONS) + "".join(rng.choices(string.digits, k=4))
+                   + "".join(rng.choices(string.ascii_uppercase, k=2)))
+    return list(plates)
+
+
+def make_queries(plates, count, seed=1):
+    rng = random.Random(seed)
+    exact = rng.sample(plates, count)
+    fuzzy = []
+    for plate in rng.sample(plates, count):
+        i = rng.randrange(len(plate))
+        fuzzy.append(plate[:i] + "8" + plate[i + 1:])
+    miss = ["ZZ" + plate[2:] + "Q" for plate in rng.sample(plates, count)]
+    return {"exact": exact, "fuzzy": fuzzy, "miss": miss}
+
+
+def old_lookup(allowed, plate):
+    for allowed_plate in allowed:
+        if plate == allowed_plate or is_fuzzy_match(plate, allowed_plate):
+            return allowed_plate
+    return None
+
+
+def time_per_query(fn, queries):
+    start = time.perf_counter()
+    for query in queries:
+        fn(query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--old-max", type=int, default=100000,
+                        help="skip the old scan above this many plates")
+    args = parser.parse_args()
+
+    print(f"{'plates':>9} {'kind':>6} {'old ms/query':>14} {'index ms/query':>15}")
+    for size in args.sizes:
+        plates = random_plates(size)
+        index = PlateIndex()
+        start = time.perf_counter()
+        index.load(plates)
+        print(f"{size:>9} index built in {(time.perf_counter() - start) * 1000:.0f} ms")
+        for kind, queries in make_queries(plates, min(args.queries, size)).items():
+            new = time_per_query(index.lookup, queries)
+            if size <= args.old_max:
+                # The old scan is slow; a handful of queries is enough
+                old = time_per_query(lambda q: old_lookup(plates, q), queries[:5])
+                old_text = f"{old:14.3f}"
+            else:
+                old_text = f"{'skipped':>14}"
+            print(f"{size:>9} {kind:>6} {old_text} {new:15.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""OCR preprocessing: fixed 3x resize + enhance_contrast (old path) vs. PlatePreprocessor.
+
+Run from the server/ directory:
+    python -m benchmarks.bench_preprocess [--fixtures DIR] [--no-ocr]
+
+Fixtures are plate crops named after their plate, e.g. AA1234BB.jpg or
+AA1234BB_2.png. Without --fixtures a synthetic set is generated. Accuracy
+(exact plate read) needs PaddleOCR; --no-ocr measures latency only.
+"""
+import argparse
+import os
+import random
+import string
+import time
+
+import cv2
+import numpy as np
+
+from preprocess import PlatePreprocessor
+from utils import clean_ocr_text
+from benchmarks.fixtures import make_plate_crop, load_image
+
+
+def old_preprocess(crop):
+    from ocr import resize_for_ocr, enhance_contrast
+    return enhance_contrast(resize_for_ocr(crop))
+
+
+def load_fixtures(directory):
+    fixtures = []
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() in ('.jpg', '.jpeg', '.png', '.bmp'):
+            fixtures.append((stem.split('_')[0].upper(), load_image(os.path.join(directory, name))))
+    return fixtures
+
+
+def synthetic_fixtures(count, seed=0):
+    rng = random.Random(seed)
+    fixtures = []
+    for _ in range(count):
+        plate = ("".join(rng.choices(string.ascii_uppercase, k=2)) + "".join(rng.choices(string.digits, k=4))
+                 + "".join(rng.choices(string.ascii_uppercase, k=2)))
+        height = rng.randint(40, 90)
+        crop = make_plate_crop(plate, height, int(height * 3.7))
+        noise = np.random.default_rng(rng.randrange(1 << 30)).normal(0, 6, crop.shape)
+        fixtures.append((plate, np.clip(crop + noise, 0, 255).astype(np.uint8)))
+    return fixtures
+
+
+def read_plate(pool, image):
+    result = pool.run(image)
+    lines = result[0] if result and result[0] else []
+    return clean_ocr_text("".join(line[1][0] for line in lines).replace(" ", "").upper())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixtures", help="directory of plate crops named after their plate")
+    parser.add_argument("--count", type=int, default=50, help="synthetic fixtures to generate")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--no-ocr", action="store_true")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures) if args.fixtures else synthetic_fixtures(args.count)
+    crops = [crop for _, crop in fixtures]
+    preprocessor = PlatePreprocessor()
+    paths = {"old": old_preprocess, "new": preprocessor.process}
+
+    pool = None
+    if not args.no_ocr:
+        from ocr import OCRPool
+        pool = OCRPool(size=1)
+        pool.start()
+
+    print(f"{len(fixtures)} fixtures")
+    for name, fn in paths.items():
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            outputs = [fn(crop) for crop in crops]
+        per_crop = (time.perf_counter() - start) / (args.repeat * len(crops)) * 1000
+        pixels = sum(out.size for out in outputs) / len(outputs)
+        line = f"{name:<4} {per_crop:7.3f} ms/crop   {pixels / 1000:7.1f} k values/crop"
+        if pool is not None:
+            start = time.perf_counter()
+            correct = sum(read_plate(pool, out) == plate for (plate, _), out in zip(fixtures, outputs))
+            ocr_ms = (time.perf_counter() - start) / len(outputs) * 1000
+            line += f"   OCR {ocr_ms:7.1f} ms/crop   accuracy {correct}/{len(fixtures)}"
+        print(line)
+
+    if pool is not None:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
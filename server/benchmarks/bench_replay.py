@@ -0,0 +1,199 @@
+"""Offline replay: recorded frames through /recognize with per-stage timings.
+
+Run from the server/ directory:
+    python -m benchmarks.bench_replay --frames frames/ [--json out.json] [--baseline old.json]
+    python -m benchmarks.bench_replay --video lane1.mp4 --concurrency 4
+    python -m benchmarks.bench_replay --stub          # no model weights needed
+    python -m benchmarks.bench_replay --stub --roi 0,0.5,1,1 --baseline full.json
+
+Every frame is JPEG-encoded once up front and posted to /recognize through
+Flask's test client, so it takes exactly the path of a real request: decode,
+inference executor, detection, OCR cache, preprocessing, OCR, allowlist lookup,
+barrier/log writes and response encoding. The stage timings come from the
+pipeline's own stage() hooks. --stub swaps in the contour detector and the
+fixed-text OCR engine, so it runs on a CPU-only box without the weights.
+The database is a temporary copy unless --db is given. --roi restricts
+detection to a region of every frame (fractions of the frame, see roi.py).
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import cv2
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def summarize(seconds):
+    values = sorted(s * 1000 for s in seconds)
+    return {
+        'count': len(values),
+        'mean_ms': statistics.mean(values),
+        'p50_ms': percentile(values, 0.50),
+        'p95_ms': percentile(values, 0.95),
+        'p99_ms': percentile(values, 0.99),
+        'max_ms': values[-1],
+    }
+
+
+def load_frames(args):
+    from benchmarks.fixtures import make_gate_frame, load_image
+    if args.frames:
+        names = sorted(name for name in os.listdir(args.frames)
+                       if name.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')))
+        frames = [load_image(os.path.join(args.frames, name)) for name in names[:args.limit]]
+    elif args.video:
+        cap = cv2.VideoCapture(args.video)
+        frames = []
+        while len(frames) < args.limit:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+    else:
+        # A few cars, each seen on several consecutive frames, like a gate camera
+        frames = [make_gate_frame(f"AA{1000 + i // 5}BB", seed=i // 5) for i in range(min(args.limit, 50))]
+    if not frames:
+        raise SystemExit("No frames to replay")
+    return [cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes() for frame in frames]
+
+
+def replay(app, bodies, args):
+    timings = {}
+    lock = threading.Lock()
+    statuses = {}
+
+    def record(name, seconds):
+        with lock:
+            timings.setdefault(name, []).append(seconds)
+
+    def client(worker_bodies):
+        test_client = app.test_client()
+        for body in worker_bodies:
+            start = time.perf_counter()
+            response = test_client.post('/recognize', data=body, content_type='image/jpeg',
+                                        query_string={'response': args.response})
+            record('request', time.perf_counter() - start)
+            with lock:
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    from stages import add_observer, remove_observer
+    add_observer(record)
+    try:
+        work = [bodies[i::args.concurrency] for i in range(args.concurrency)]
+        threads = [threading.Thread(target=client, args=(chunk,)) for chunk in work]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+    finally:
+        remove_observer(record)
+    return timings, statuses, wall
+
+
+def compare(report, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nvs. {baseline_path}:")
+    print(f"  {'fps':<12} {baseline['fps']:9.1f} -> {report['fps']:9.1f}")
+    for name, stats in report['stages'].items():
+        old = baseline['stages'].get(name)
+        if old:
+            change = (stats['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0.0
+            print(f"  {name:<12} p50 {old['p50_ms']:8.2f} -> {stats['p50_ms']:8.2f} ms ({change:+.0f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--frames", help="directory of frames, replayed in name order")
+    source.add_argument("--video", help="video file to replay")
+    parser.add_argument("--limit", type=int, default=1000, help="maximum frames to replay")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the frames this many times")
+    parser.add_argument("--concurrency", type=int, default=1, help="parallel clients")
+    parser.add_argument("--response", default="decision", help="response mode of /recognize")
+    parser.add_argument("--allow", action="append", default=[], help="add a plate to the allowlist")
+    parser.add_argument("--stub", action="store_true", help="stub detector and OCR, no weights needed")
+    parser.add_argument("--db", help="database to use instead of a temporary one")
+    parser.add_argument("--roi", help="detection region X1,Y1,X2,Y2 in fractions of the frame")
+    parser.add_argument("--roi-input-size", type=int, help="detector input size for the --roi region")
+    parser.add_argument("--json", help="write the report here")
+    parser.add_argument("--baseline", help="earlier --json report to compare against")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    # Settings are read when config is imported, so they go into the environment first
+    os.environ['DB_PATH'] = args.db or os.path.join(tmp.name, "replay.db")
+    os.environ.setdefault('LOG_RETENTION_INTERVAL', '0')
+    if args.stub:
+        os.environ['DETECTOR_BACKEND'] = 'stub'
+        os.environ['OCR_ENGINE'] = 'stub'
+        args.allow.append(os.environ.get('OCR_STUB_TEXT', 'AA1234BB'))
+    if args.roi:
+        roi_path = os.path.join(tmp.name, "roi.json")
+        with open(roi_path, 'w') as f:
+            json.dump({'default': {'roi': [float(v) for v in args.roi.split(',')],
+                                   'input_size': args.roi_input_size}}, f)
+        os.environ['ROI_CONFIG'] = roi_path
+
+    from app import app
+    from db import init_db
+    from recognition import warmup
+    from log_writer import shutdown_log_writer
+    import config
+
+    init_db()
+    for plate in args.allow:
+        app.test_client().post('/add_plate', json={'plate': plate})
+    bodies = load_frames(args) * args.repeat
+    start = time.perf_counter()
+    warmup()
+    warmup_s = time.perf_counter() - start
+
+    timings, statuses, wall = replay(app, bodies, args)
+    shutdown_log_writer()
+
+    order = ['request', 'decode', 'detect', 'ocr_cache', 'preprocess', 'ocr', 'lookup',
+             'barrier', 'log', 'encode']
+    report = {
+        'frames': len(bodies),
+        'concurrency': args.concurrency,
+        'wall_s': wall,
+        'fps': len(bodies) / wall,
+        'warmup_s': warmup_s,
+        # ru_maxrss is in KiB on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'statuses': {str(code): count for code, count in sorted(statuses.items())},
+        'stages': {name: summarize(timings[name]) for name in order + sorted(set(timings) - set(order))
+                   if name in timings},
+        'config': {'detector': config.DETECTOR_BACKEND, 'ocr': config.OCR_ENGINE,
+                   'response': args.response, 'roi': args.roi, 'python': sys.version.split()[0]},
+    }
+
+    print(f"{report['frames']} frames in {wall:.1f}s: {report['fps']:.1f} fps, "
+          f"peak RSS {report['peak_rss_mb']:.0f} MB, warm-up {warmup_s:.1f}s, statuses {report['statuses']}")
+    print(f"{'stage':<12} {'count':>6} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, s in report['stages'].items():
+        print(f"{name:<12} {s['count']:>6} {s['mean_ms']:>9.2f} {s['p50_ms']:>9.2f} "
+              f"{s['p95_ms']:>9.2f} {s['p99_ms']:>9.2f} {s['max_ms']:>9.2f}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        compare(report, args.baseline)
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
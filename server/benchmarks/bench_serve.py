@@ -0,0 +1,132 @@
+"""Load test of serve.py: /recognize throughput as the number of workers grows.
+
+Run from the server/ directory:
+    python -m benchmarks.bench_serve [--workers 1,2,4] [--clients 8] [--duration 20]
+
+For every worker count a fresh serve.py is started on a temporary database
+and hammered by --clients client processes posting the same JPEG frame. It
+also checks that all workers report the same barrier state after a
+/set_barrier, which a per-process barrier would fail.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import requests
+
+from benchmarks.fixtures import make_plate_crop, load_image
+
+
+def test_frame(path=None):
+    if path:
+        frame = load_image(path)
+    else:
+        frame = np.full((720, 1280, 3), 90, dtype=np.uint8)
+        frame[400:460, 500:720] = make_plate_crop("AA1234BB", 60, 220)
+    return cv2.imencode('.jpg', frame)[1].tobytes()
+
+
+def client(url, body, duration, results):
+    session = requests.Session()
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            response = session.post(f"{url}/recognize?response=decision", data=body,
+                                    headers={'Content-Type': 'image/jpeg'}, timeout=30)
+            ok = response.status_code == 200
+        except requests.RequestException:
+            ok = False
+        if ok:
+            latencies.append((time.perf_counter() - start) * 1000)
+        else:
+            errors += 1
+    results.put((latencies, errors))
+
+
+def wait_ready(url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{url}/ready", timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"Server at {url} did not become ready in {timeout}s")
+
+
+def check_barrier(url, checks=40):
+    requests.post(f"{url}/set_barrier", json={'state': 'raised'}, timeout=5)
+    # Fresh connections so the requests spread over the workers
+    states = {requests.get(f"{url}/barrier_status", timeout=5).json()['status'] for _ in range(checks)}
+    requests.post(f"{url}/set_barrier", json={'state': 'lowered'}, timeout=5)
+    return states == {'raised'}
+
+
+def run(workers, args, body):
+    url = f"http://127.0.0.1:{args.port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DB_PATH=os.path.join(tmp, "plates.db"))
+        server = subprocess.Popen([sys.executable, "serve.py", "--workers", str(workers),
+                                   "--host", "127.0.0.1", "--port", str(args.port)], env=env)
+        try:
+            wait_ready(url, args.startup_timeout)
+            # Workers warm independently; give the rest a moment and warm the connections
+            time.sleep(args.warmup)
+            consistent = check_barrier(url)
+            results = mp.Queue()
+            clients = [mp.Process(target=client, args=(url, body, args.duration, results))
+                       for _ in range(args.clients)]
+            for c in clients:
+                c.start()
+            collected = [results.get() for _ in clients]
+            for c in clients:
+                c.join()
+        finally:
+            server.terminate()
+            server.wait()
+    latencies = sorted(ms for lat, _ in collected for ms in lat)
+    errors = sum(err for _, err in collected)
+    return {
+        'throughput': len(latencies) / args.duration,
+        'p50': statistics.median(latencies) if latencies else float('nan'),
+        'p95': latencies[int(len(latencies) * 0.95)] if latencies else float('nan'),
+        'errors': errors,
+        'consistent': consistent,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--image", help="frame to post (default: a synthetic plate)")
+    args = parser.parse_args()
+
+    body = test_frame(args.image)
+    print(f"{os.cpu_count()} CPUs, {args.clients} clients, {args.duration:.0f}s per run")
+    print(f"{'workers':>7} {'req/s':>8} {'speedup':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7} {'barrier':>8}")
+    baseline = None
+    for workers in [int(n) for n in args.workers.split(',')]:
+        r = run(workers, args, body)
+        baseline = baseline or r['throughput']
+        print(f"{workers:>7} {r['throughput']:>8.1f} {r['throughput'] / baseline:>7.2f}x "
+              f"{r['p50']:>8.1f} {r['p95']:>8.1f} {r['errors']:>7} "
+              f"{'shared' if r['consistent'] else 'SPLIT':>8}")
+
+
+if __name__ == "__main__":
+    main()
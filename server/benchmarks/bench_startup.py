@@ -0,0 +1,96 @@
+"""Server startup: import time of app.py and latency of the first /recognize.
+
+Run from the server/ directory:
+    python -m benchmarks.bench_startup [--runs 3] [--importtime]
+
+Each run is a fresh interpreter against a temporary database. "lazy" sends
+the first request straight after import, so it pays for loading the models;
+"warm" calls recognition.warmup() first, as the server does at startup.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HEAVY_MODULES = ('tkinter', 'requests', 'torch', 'ultralytics', 'paddleocr', 'onnxruntime', 'openvino')
+
+SCRIPT = r"""
+import json, sys, time
+start = time.perf_counter()
+import app
+import_ms = (time.perf_counter() - start) * 1000
+heavy = [name for name in HEAVY_MODULES if name in sys.modules]
+
+from db import init_db
+from recognition import warmup
+from benchmarks.fixtures import make_plate_crop
+import cv2, numpy as np
+
+init_db()
+warmup_ms = None
+if WARM:
+    start = time.perf_counter()
+    warmup()
+    warmup_ms = (time.perf_counter() - start) * 1000
+
+frame = np.full((720, 1280, 3), 90, dtype=np.uint8)
+frame[400:460, 500:720] = make_plate_crop("AA1234BB", 60, 220)
+body = cv2.imencode('.jpg', frame)[1].tobytes()
+client = app.app.test_client()
+latencies = []
+for _ in range(2):
+    start = time.perf_counter()
+    client.post('/recognize?response=decision', data=body, content_type='image/jpeg')
+    latencies.append((time.perf_counter() - start) * 1000)
+print(json.dumps({'import_ms': import_ms, 'heavy': heavy, 'warmup_ms': warmup_ms,
+                  'first_ms': latencies[0], 'second_ms': latencies[1]}))
+"""
+
+
+def run(warm, env):
+    code = f"HEAVY_MODULES = {HEAVY_MODULES!r}\nWARM = {warm}\n" + SCRIPT
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True,
+                         check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def import_profile(env, top):
+    # -X importtime writes "self | cumulative | module" lines to stderr
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], env=env,
+                         capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    for cumulative, module in sorted(rows, reverse=True)[:top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {module}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--importtime", action="store_true", help="show the slowest imports")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DB_PATH=os.path.join(tmp, "plates.db"))
+        for name, warm in (("lazy", False), ("warm", True)):
+            results = [run(warm, env) for _ in range(args.runs)]
+            mean = lambda key: statistics.mean(r[key] for r in results)
+            line = (f"{name:<5} import {mean('import_ms'):8.1f} ms   "
+                    f"first request {mean('first_ms'):8.1f} ms   second {mean('second_ms'):8.1f} ms")
+            if warm:
+                line += f"   warmup {mean('warmup_ms'):8.1f} ms"
+            print(line)
+        print(f"heavy modules loaded by 'import app': {', '.join(results[0]['heavy']) or 'none'}")
+        if args.importtime:
+            print("slowest imports (cumulative):")
+            import_profile(env, 15)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import cv2
+import numpy as np
+
+
+def make_plate_crop(text="AA1234BB", height=60, width=220):
+    # White plate with black characters, roughly what YOLO hands to OCR
+    img = np.full((height, width, 3), 255, dtype=np.uint8)
+    cv2.rectangle(img, (2, 2), (width - 3, height - 3), (0, 0, 0), 2)
+    scale = height / 40
+    (tw, th), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, 2)
+    org = ((width - tw) // 2, (height + th) // 2)
+    cv2.putText(img, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, (0, 0, 0), 2, cv2.LINE_AA)
+    return img
+
+
+def load_image(path):
+    img = cv2.imread(path, cv2.IMREAD_COLOR)
+    if img is None:
+        raise SystemExit(f"Cannot read image: {path}")
+    return img
+
+
+def make_gate_frame(text="AA1234BB", seed=0, width=1280, height=720):
+    # Grey noisy frame with one plate somewhere in the lower half, like a gate camera sees it
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(60, 120, (height, width, 3), dtype=np.uint8)
+    x, y = int(rng.integers(0, width - 220)), int(rng.integers(height // 2, height - 60))
+    frame[y:y + 60, x:x + 220] = make_plate_crop(text, 60, 220)
+    return frame
@@ -0,0 +1,127 @@
+import os
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_float(name, default):
+    return float(os.environ.get(name, default))
+
+
+DB_PATH = os.environ.get("DB_PATH", "allowed_plates.db")
+
+# Plate detector: ultralytics (PyTorch), onnxruntime or openvino (exported ONNX, see detector.py)
+DETECTOR_BACKEND = os.environ.get("DETECTOR_BACKEND", "ultralytics")
+DETECTOR_MODEL = os.environ.get("DETECTOR_MODEL", "")  # empty: models/best.pt or models/best.onnx
+DETECTOR_INPUT_SIZE = _env_int("DETECTOR_INPUT_SIZE", 640)
+DETECTOR_THREADS = _env_int("DETECTOR_THREADS", 0)  # 0: the runtime's default
+DETECTOR_CONF = _env_float("DETECTOR_CONF", 0.25)
+DETECTOR_IOU = _env_float("DETECTOR_IOU", 0.7)
+# Per-lane detection regions, JSON file (see roi.py); empty: whole frame for every lane
+ROI_CONFIG = os.environ.get("ROI_CONFIG", "")
+# When the ROI holds no plate, search again in the ROI grown this many times around its centre
+ROI_ADAPTIVE = _env_int("ROI_ADAPTIVE", 1)
+ROI_EXPAND = _env_float("ROI_EXPAND", 2.0)
+
+# Load and warm the detector and OCR in the background at startup (0: on the first request)
+WARMUP_ON_START = _env_int("WARMUP_ON_START", 1)
+
+# OCR engine pool; OCR_ENGINE=stub (and DETECTOR_BACKEND=stub) run the pipeline without models
+OCR_ENGINE = os.environ.get("OCR_ENGINE", "paddle")
+OCR_STUB_TEXT = os.environ.get("OCR_STUB_TEXT", "AA1234BB")
+OCR_POOL_SIZE = _env_int("OCR_POOL_SIZE", 2)
+OCR_QUEUE_SIZE = _env_int("OCR_QUEUE_SIZE", 16)
+OCR_QUEUE_TIMEOUT = _env_float("OCR_QUEUE_TIMEOUT", 2.0)
+
+# OCR input: crops are scaled to this plate height (px) instead of a fixed 3x
+OCR_TARGET_HEIGHT = _env_int("OCR_TARGET_HEIGHT", 96)
+OCR_MAX_WIDTH = _env_int("OCR_MAX_WIDTH", 960)
+
+# /recognize inference runs on dedicated threads; requests beyond the queue get a 503,
+# requests not answered within RECOGNIZE_TIMEOUT seconds a 504
+INFERENCE_WORKERS = _env_int("INFERENCE_WORKERS", 4)
+INFERENCE_QUEUE_SIZE = _env_int("INFERENCE_QUEUE_SIZE", 16)
+RECOGNIZE_TIMEOUT = _env_float("RECOGNIZE_TIMEOUT", 10.0)
+
+# Micro-batching of detector frames across concurrent requests (OCR crops go to the pool directly)
+DETECT_MAX_BATCH = _env_int("DETECT_MAX_BATCH", 8)
+DETECT_MAX_WAIT_MS = _env_float("DETECT_MAX_WAIT_MS", 10)
+
+# Allowed plate lookup: maximum edit distance accepted as a fuzzy match
+PLATE_MAX_DISTANCE = _env_int("PLATE_MAX_DISTANCE", 1)
+# Seconds between checks for allowlist changes made by other processes
+PLATE_SYNC_INTERVAL = _env_float("PLATE_SYNC_INTERVAL", 1.0)
+# Allowlist changes kept for /plates/changes; clients further behind get the full list
+ALLOWED_JOURNAL_SIZE = _env_int("ALLOWED_JOURNAL_SIZE", 10000)
+
+# Background access/barrier log writer
+LOG_FLUSH_INTERVAL = _env_float("LOG_FLUSH_INTERVAL", 0.2)
+LOG_MAX_BATCH = _env_int("LOG_MAX_BATCH", 500)
+# Seconds a log write waits for the SQLite lock, and retries of a batch that still found it locked
+LOG_DB_TIMEOUT = _env_float("LOG_DB_TIMEOUT", 30.0)
+LOG_WRITE_RETRIES = _env_int("LOG_WRITE_RETRIES", 5)
+# Seconds a log query waits for pending rows to be written
+LOG_FLUSH_TIMEOUT = _env_float("LOG_FLUSH_TIMEOUT", 5.0)
+# Rows per page of /log, /barrier_log and /timeline (?limit= is capped at the maximum)
+LOG_PAGE_SIZE = _env_int("LOG_PAGE_SIZE", 100)
+LOG_MAX_PAGE_SIZE = _env_int("LOG_MAX_PAGE_SIZE", 1000)
+
+# Log retention (retention.py): days of logs kept in the main database (0: all), where older
+# rows go as monthly SQLite partitions, when those are gzipped to JSONL and when archives are
+# deleted (0: never), and how often the server runs it (0: only by hand / cron)
+LOG_RETENTION_DAYS = _env_int("LOG_RETENTION_DAYS", 30)
+LOG_PARTITION_DIR = os.environ.get("LOG_PARTITION_DIR", "log_archive")
+LOG_ARCHIVE_AFTER_DAYS = _env_int("LOG_ARCHIVE_AFTER_DAYS", 90)
+LOG_ARCHIVE_KEEP_DAYS = _env_int("LOG_ARCHIVE_KEEP_DAYS", 0)
+LOG_RETENTION_INTERVAL = _env_float("LOG_RETENTION_INTERVAL", 3600)
+LOG_RETENTION_BATCH = _env_int("LOG_RETENTION_BATCH", 5000)
+
+# /recognize response payload: default mode and annotated image encoding
+RESPONSE_MODE = os.environ.get("RESPONSE_MODE", "full")
+RESPONSE_JPEG_QUALITY = _env_int("RESPONSE_JPEG_QUALITY", 80)
+THUMBNAIL_MAX_WIDTH = _env_int("THUMBNAIL_MAX_WIDTH", 320)
+
+# /metrics (Prometheus text format) and the opt-in slow-request profiler behind /debug/profile:
+# PROFILE_SLOWEST is how many of the slowest requests keep a profile (0: profiler off)
+METRICS_ENABLED = _env_int("METRICS_ENABLED", 1)
+PROFILE_SLOWEST = _env_int("PROFILE_SLOWEST", 0)
+PROFILE_INTERVAL_MS = _env_float("PROFILE_INTERVAL_MS", 5)
+
+# Production serving (serve.py)
+SERVE_HOST = os.environ.get("SERVE_HOST", "0.0.0.0")
+SERVE_PORT = _env_int("SERVE_PORT", 5000)
+SERVE_WORKERS = _env_int("SERVE_WORKERS", 0)  # 0: one worker process per CPU core
+
+# Stream ingestion (streams.py)
+STREAM_WORKERS = _env_int("STREAM_WORKERS", 0)  # 0: one worker process per CPU core
+STREAM_RECONNECT_DELAY = _env_float("STREAM_RECONNECT_DELAY", 2.0)
+STREAM_STATS_INTERVAL = _env_float("STREAM_STATS_INTERVAL", 5.0)
+# Seconds a lane barrier stays up after the last allowed plate
+LANE_BARRIER_HOLD = _env_float("LANE_BARRIER_HOLD", 15.0)
+
+# Plate tracking across consecutive frames of one camera/lane
+TRACK_IOU = _env_float("TRACK_IOU", 0.3)
+TRACK_MAX_SHIFT = _env_float("TRACK_MAX_SHIFT", 0.5)  # centre shift, in box widths
+TRACK_TTL = _env_float("TRACK_TTL", 3.0)  # seconds a track survives without a detection
+TRACK_CONFIRM_VOTES = _env_int("TRACK_CONFIRM_VOTES", 3)
+# 1: look up, log and act on a track's first read instead of waiting for TRACK_CONFIRM_VOTES
+# agreeing reads; faster at the gate, but a misread is logged and acted on
+TRACK_DECIDE_ON_FIRST_READ = _env_int("TRACK_DECIDE_ON_FIRST_READ", 0)
+# Seconds a locked plate is trusted before one more OCR read must confirm it
+TRACK_LOCK_TTL = _env_float("TRACK_LOCK_TTL", 2.0)
+# 1: claim each verdict in the lane_decisions table before logging and acting on it, so
+# several worker processes act on one car once (serve.py turns it on; one process needs no claim)
+DECISION_SHARED = _env_int("DECISION_SHARED", 0)
+# Seconds in which the same verdict for a plate on a lane is logged and acted on only once,
+# whichever worker process reaches it first
+DECISION_DEDUPE_WINDOW = _env_float("DECISION_DEDUPE_WINDOW", 30.0)
+
+# OCR result cache keyed by a perceptual hash of the plate crop (size 0 disables it)
+OCR_CACHE_SIZE = _env_int("OCR_CACHE_SIZE", 256)
+OCR_CACHE_TTL = _env_float("OCR_CACHE_TTL", 30.0)
+OCR_CACHE_MAX_DISTANCE = _env_int("OCR_CACHE_MAX_DISTANCE", 40)  # dHash Hamming distance, of 256 bits
+# Thumbnail correlation a candidate needs; one changed character scores about 0.97
+OCR_CACHE_MIN_SIMILARITY = _env_float("OCR_CACHE_MIN_SIMILARITY", 0.985)
+OCR_CACHE_HASH_WIDTH = _env_int("OCR_CACHE_HASH_WIDTH", 32)
+OCR_CACHE_HASH_HEIGHT = _env_int("OCR_CACHE_HASH_HEIGHT", 8)
@@ -1,9 +1,45 @@
+import base64
+import codecs
+import csv
+import io
+import json
 import sqlite3
-from flask import jsonify
+import threading
+import time
+from datetime import datetime
+from flask import Response, jsonify
+from plate_index import PlateIndex
+from log_writer import get_log_writer, utc_timestamp, ACCESS_INSERT, BARRIER_INSERT
+import config
+from stages import stage
+
+# Resident copy of the allowed table, kept in sync by add_plate/delete_plate and,
+# for changes made by other processes, by the allowed_version counter
+allowed_plates = PlateIndex()
+_allowed_version = None
+_version_checked = 0.0
+_sync_lock = threading.Lock()
+
+# barrier_state key of the default (lane-less) barrier
+DEFAULT_LANE = ''
+
+def _ensure_column(cursor, table, column, declaration):
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [row[1] for row in cursor.fetchall()]:
+        try:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+        except sqlite3.OperationalError as e:
+            # Another process (e.g. a stream worker) migrated the table first
+            if 'duplicate column' not in str(e):
+                raise
 
 def init_db():
-    with sqlite3.connect("allowed_plates.db") as conn:
+    with sqlite3.connect(config.DB_PATH) as conn:
         cursor = conn.cursor()
+        # Lets retention.py hand pages freed by log rollover back to the filesystem; only takes
+        # effect on a new database, retention switches existing ones over with one VACUUM
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        cursor.execute("PRAGMA journal_mode=WAL")
         cursor.execute("""CREATE TABLE IF NOT EXISTS allowed (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             plate TEXT UNIQUE
@@ -19,18 +55,157 @@ def init_db():
             status TEXT,
             timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
         )""")
+        # Stream lanes (streams.py) log which gate a row came from; NULL for /recognize
+        _ensure_column(cursor, "access_log", "lane", "TEXT")
+        _ensure_column(cursor, "barrier_log", "lane", "TEXT")
+        # Newest-first pages and time ranges walk these instead of scanning and sorting the table
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_access_log_timestamp ON access_log (timestamp, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_access_log_plate ON access_log (plate, timestamp, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_barrier_log_timestamp ON barrier_log (timestamp, id)")
+        # Current barrier position per lane, shared by every server worker and stream process
+        cursor.execute("""CREATE TABLE IF NOT EXISTS barrier_state (
+            lane TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            timestamp DATETIME
+        )""")
+        # Last verdict per lane and plate, so that only one process logs and acts on a vehicle
+        cursor.execute("""CREATE TABLE IF NOT EXISTS lane_decisions (
+            lane TEXT NOT NULL,
+            plate TEXT NOT NULL,
+            allowed INTEGER NOT NULL,
+            decided_at REAL NOT NULL,
+            PRIMARY KEY (lane, plate)
+        )""")
+        # Bumped on every change to allowed, so processes know when to reload their index
+        cursor.execute("""CREATE TABLE IF NOT EXISTS allowed_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )""")
+        cursor.execute("INSERT OR IGNORE INTO allowed_version (id, version) VALUES (1, 0)")
+        # One row per version: what changed, so clients can catch up with a delta
+        cursor.execute("""CREATE TABLE IF NOT EXISTS allowed_changes (
+            version INTEGER PRIMARY KEY,
+            plate TEXT NOT NULL,
+            op TEXT NOT NULL
+        )""")
+        for event in ("insert", "update", "delete"):
+            # Replaced by the journal triggers below
+            cursor.execute(f"DROP TRIGGER IF EXISTS allowed_{event}_version")
+        bump = "UPDATE allowed_version SET version = version + 1 WHERE id = 1;"
+        journal = "INSERT INTO allowed_changes (version, plate, op) SELECT version, {}, '{}' FROM allowed_version WHERE id = 1;"
+        triggers = {
+            "INSERT": bump + journal.format("NEW.plate", "add"),
+            "DELETE": bump + journal.format("OLD.plate", "delete"),
+            "UPDATE": bump + journal.format("OLD.plate", "delete") + bump + journal.format("NEW.plate", "add"),
+        }
+        for event, body in triggers.items():
+            cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS allowed_{event.lower()}_journal
+                AFTER {event} ON allowed
+                BEGIN {body} END""")
         conn.commit()
+        _reload_allowed_plates(cursor)
+
+def _reload_allowed_plates(cursor):
+    global _allowed_version, _version_checked
+    cursor.execute("SELECT version FROM allowed_version WHERE id = 1")
+    version = cursor.fetchone()[0]
+    cursor.execute("SELECT plate FROM allowed")
+    allowed_plates.load(row[0] for row in cursor.fetchall())
+    _allowed_version = version
+    _version_checked = time.monotonic()
 
-def log_access(plate, status):
-    with sqlite3.connect("allowed_plates.db") as conn:
+def sync_allowed_plates(force=False):
+    # Picks up plates added or deleted by other worker processes
+    global _version_checked
+    if not force and time.monotonic() - _version_checked < config.PLATE_SYNC_INTERVAL:
+        return
+    if not _sync_lock.acquire(blocking=force):
+        # Another thread is already checking; keep using the current index
+        return
+    try:
+        _version_checked = time.monotonic()
+        with sqlite3.connect(config.DB_PATH) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT version FROM allowed_version WHERE id = 1")
+            if cursor.fetchone()[0] != _allowed_version:
+                _reload_allowed_plates(cursor)
+    finally:
+        _sync_lock.release()
+
+def _trim_journal(cursor, version):
+    cursor.execute("DELETE FROM allowed_changes WHERE version <= ?", (version - config.ALLOWED_JOURNAL_SIZE,))
+
+def _change_allowed(sql, plate, apply):
+    # Applies the change to the resident index only if nothing else changed the table
+    # since it was loaded; otherwise the next sync reloads it from scratch
+    global _allowed_version
+    with stage('db_allowlist_write'), sqlite3.connect(config.DB_PATH) as conn:
         cursor = conn.cursor()
-        cursor.execute("INSERT INTO access_log (plate, status) VALUES (?, ?)", (plate, status))
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT version FROM allowed_version WHERE id = 1")
+        before = cursor.fetchone()[0]
+        cursor.execute(sql, (plate,))
+        cursor.execute("SELECT version FROM allowed_version WHERE id = 1")
+        after = cursor.fetchone()[0]
+        if after != before:
+            _trim_journal(cursor, after)
         conn.commit()
+    with _sync_lock:
+        if before == _allowed_version:
+            apply(plate)
+            _allowed_version = after
 
-def log_barrier_status(status):
-    with sqlite3.connect("allowed_plates.db") as conn:
+def log_access(plate, status, lane=None):
+    get_log_writer().write(ACCESS_INSERT, (plate, status, utc_timestamp(), lane))
+
+def log_barrier_status(status, lane=None):
+    get_log_writer().write(BARRIER_INSERT, (status, utc_timestamp(), lane))
+
+def get_barrier_state(lane=None):
+    with sqlite3.connect(config.DB_PATH) as conn:
         cursor = conn.cursor()
-        cursor.execute("INSERT INTO barrier_log (status) VALUES (?)", (status,))
+        cursor.execute("SELECT status FROM barrier_state WHERE lane = ?", (lane or DEFAULT_LANE,))
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+def set_barrier_state(status, lane=None):
+    # Written synchronously: every worker must see the new position on its next read
+    with stage('db_barrier_write'), sqlite3.connect(config.DB_PATH) as conn:
+        conn.execute("""INSERT INTO barrier_state (lane, status, timestamp) VALUES (?, ?, ?)
+                        ON CONFLICT(lane) DO UPDATE SET status = excluded.status,
+                                                        timestamp = excluded.timestamp""",
+                     (lane or DEFAULT_LANE, status, utc_timestamp()))
+        conn.commit()
+
+def claim_decision(plate, allowed, lane=None, window=config.DECISION_DEDUPE_WINDOW):
+    """True if this process should log and act on the verdict.
+
+    Every worker tracks the frames it receives on its own, so the frames of
+    one car spread over several workers reach the same verdict in each of
+    them. The first to record it in lane_decisions claims it; the same
+    verdict for the same plate and lane within window seconds is refused.
+    """
+    now = time.time()
+    with stage('db_decision_write'), sqlite3.connect(config.DB_PATH) as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("DELETE FROM lane_decisions WHERE decided_at < ?", (now - window,))
+        cursor.execute("SELECT allowed FROM lane_decisions WHERE lane = ? AND plate = ?",
+                       (lane or DEFAULT_LANE, plate))
+        row = cursor.fetchone()
+        if row is not None and bool(row[0]) == bool(allowed):
+            return False
+        cursor.execute("""INSERT INTO lane_decisions (lane, plate, allowed, decided_at) VALUES (?, ?, ?, ?)
+                          ON CONFLICT(lane, plate) DO UPDATE SET allowed = excluded.allowed,
+                                                                 decided_at = excluded.decided_at""",
+                       (lane or DEFAULT_LANE, plate, int(bool(allowed)), now))
+        conn.commit()
+    return True
+
+def clear_decisions(lane=None):
+    # The operator lowered the barrier: the next verdict on this lane is acted on again
+    with stage('db_decision_write'), sqlite3.connect(config.DB_PATH) as conn:
+        conn.execute("DELETE FROM lane_decisions WHERE lane = ?", (lane or DEFAULT_LANE,))
         conn.commit()
 
 def levenshtein(s1, s2):
@@ -52,59 +227,337 @@ def levenshtein(s1, s2):
 def is_fuzzy_match(plate, allowed_plate, max_dist=1):
     return levenshtein(plate, allowed_plate) <= max_dist
 
+def normalize_plate(plate):
+    return plate.replace(" ", "").upper()
+
 def is_plate_allowed(plate):
-    plate = plate.replace(" ", "").upper()
-    with sqlite3.connect("allowed_plates.db") as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT plate FROM allowed")
-        allowed = [row[0] for row in cursor.fetchall()]
-        for allowed_plate in allowed:
-            if plate == allowed_plate or is_fuzzy_match(plate, allowed_plate):
-                return True, allowed_plate
+    plate = normalize_plate(plate)
+    sync_allowed_plates()
+    allowed_plate = allowed_plates.lookup(plate)
+    if allowed_plate is not None:
+        return True, allowed_plate
     return False, plate
 
 def add_plate(request):
     data = request.get_json()
-    plate = data.get("plate", "").replace(" ", "").upper()
+    plate = normalize_plate(data.get("plate", ""))
     if not plate:
         return jsonify({'error': 'plate is required'}), 400
     try:
-        with sqlite3.connect("allowed_plates.db") as conn:
-            cursor = conn.cursor()
-            cursor.execute("INSERT OR IGNORE INTO allowed (plate) VALUES (?)", (plate,))
-            conn.commit()
+        _change_allowed("INSERT OR IGNORE INTO allowed (plate) VALUES (?)", plate, allowed_plates.add)
         return jsonify({'status': 'added', 'plate': plate})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 def delete_plate(request):
     data = request.get_json()
-    plate = data.get("plate", "").replace(" ", "").upper()
+    plate = normalize_plate(data.get("plate", ""))
     if not plate:
         return jsonify({'error': 'plate is required'}), 400
-    with sqlite3.connect("allowed_plates.db") as conn:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM allowed WHERE plate = ?", (plate,))
-        conn.commit()
+    _change_allowed("DELETE FROM allowed WHERE plate = ?", plate, allowed_plates.remove)
     return jsonify({'status': 'deleted', 'plate': plate})
 
-def list_plates():
-    with sqlite3.connect("allowed_plates.db") as conn:
+def _plates_etag(version):
+    return f"plates-{version}"
+
+def _not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+def list_plates(request):
+    # Served from the resident index; the version is the ETag
+    sync_allowed_plates(force=True)
+    with _sync_lock:
+        version = _allowed_version
+        if request.if_none_match.contains(_plates_etag(version)):
+            return _not_modified(_plates_etag(version))
+        plates = allowed_plates.plates()
+    response = jsonify({'plates': plates, 'version': version})
+    response.set_etag(_plates_etag(version))
+    return response
+
+def get_plate_changes(request):
+    """Changes to the allowlist after version ?since=, oldest first.
+
+    If the journal no longer reaches back to since (it keeps the last
+    ALLOWED_JOURNAL_SIZE changes), the response has reset set and carries the
+    whole list instead.
+    """
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({'error': 'since must be an integer'}), 400
+    with sqlite3.connect(config.DB_PATH) as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT plate FROM allowed")
-        plates = [row[0] for row in cursor.fetchall()]
-    return jsonify({'plates': plates})
+        # One read transaction, so the version and the journal agree
+        cursor.execute("BEGIN")
+        cursor.execute("SELECT version FROM allowed_version WHERE id = 1")
+        version = cursor.fetchone()[0]
+        etag = _plates_etag(version)
+        if request.if_none_match.contains(etag):
+            return _not_modified(etag)
+        cursor.execute("SELECT MIN(version) FROM allowed_changes")
+        oldest = cursor.fetchone()[0]
+        if since == version:
+            body = {'version': version, 'reset': False, 'changes': []}
+        elif 0 <= since < version and oldest is not None and oldest <= since + 1:
+            cursor.execute("SELECT version, plate, op FROM allowed_changes WHERE version > ? ORDER BY version",
+                           (since,))
+            body = {'version': version, 'reset': False,
+                    'changes': [{'version': v, 'plate': plate, 'op': op} for v, plate, op in cursor.fetchall()]}
+        else:
+            cursor.execute("SELECT plate FROM allowed ORDER BY plate")
+            body = {'version': version, 'reset': True, 'plates': [row[0] for row in cursor.fetchall()]}
+    response = jsonify(body)
+    response.set_etag(etag)
+    return response
+
+# Bulk import/export formats: CSV with the plate in the first column, or JSONL
+PLATE_FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+JSONL_MIMETYPES = {'application/x-ndjson', 'application/jsonl', 'application/x-jsonlines'}
+# Row errors listed in an import response; the rest are only counted
+IMPORT_MAX_ERRORS = 100
+
+def _plate_format(request, default='csv'):
+    fmt = request.args.get('format')
+    if fmt is None:
+        fmt = 'jsonl' if request.mimetype in JSONL_MIMETYPES else default
+    if fmt not in PLATE_FORMATS:
+        raise ValueError("format must be csv or jsonl")
+    return fmt
 
-def get_log():
-    with sqlite3.connect("allowed_plates.db") as conn:
+def _read_plate_rows(stream, fmt):
+    # Yields (line, plate, error) per data row, decoding the body as it arrives
+    lines = codecs.getreader('utf-8-sig')(stream)
+    if fmt == 'csv':
+        reader = csv.reader(lines)
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            if reader.line_num == 1 and row[0].strip().lower() == 'plate':
+                continue
+            plate = normalize_plate(row[0])
+            yield reader.line_num, plate, None if plate else "empty plate"
+        return
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except ValueError:
+            yield number, None, "invalid JSON"
+            continue
+        if isinstance(value, dict):
+            value = value.get('plate')
+        if not isinstance(value, str):
+            yield number, None, 'expected a string or an object with "plate"'
+            continue
+        plate = normalize_plate(value)
+        yield number, plate, None if plate else "empty plate"
+
+def import_plates(request):
+    """Bulk upload of plates as CSV or JSONL, applied in one transaction.
+
+    ?mode=merge (the default) adds the valid rows and reports the invalid
+    ones. ?mode=replace makes the uploaded list the whole allowlist; it is
+    applied as a diff inside the same transaction, so other readers see
+    either the old list or the new one, and it is refused if any row has an
+    error.
+    """
+    mode = request.args.get('mode', 'merge')
+    if mode not in ('merge', 'replace'):
+        return jsonify({'error': 'mode must be merge or replace'}), 400
+    try:
+        fmt = _plate_format(request)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    # A dict keeps the upload order and drops duplicates
+    plates, errors, error_count, rows = {}, [], 0, 0
+    try:
+        for line, plate, error in _read_plate_rows(request.stream, fmt):
+            rows += 1
+            if error:
+                error_count += 1
+                if len(errors) < IMPORT_MAX_ERRORS:
+                    errors.append({'line': line, 'error': error})
+                continue
+            plates[plate] = None
+    except (UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'error': f"unreadable {fmt} body: {e}"}), 400
+    result = {'mode': mode, 'rows': rows, 'duplicates': rows - error_count - len(plates),
+              'error_count': error_count, 'errors': errors}
+    if mode == 'replace' and error_count:
+        return jsonify({**result, 'error': 'replace refused: some rows have errors'}), 422
+    if mode == 'replace' and not plates:
+        return jsonify({**result, 'error': 'replace refused: no plates in the upload'}), 400
+
+    removed = 0
+    with stage('db_allowlist_write'), sqlite3.connect(config.DB_PATH) as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT plate, status, timestamp FROM access_log ORDER BY timestamp DESC LIMIT 100")
-        rows = cursor.fetchall()
-    return jsonify({'log': rows})
+        cursor.execute("BEGIN IMMEDIATE")
+        if mode == 'replace':
+            cursor.execute("SELECT plate FROM allowed")
+            stale = [row for row in cursor.fetchall() if row[0] not in plates]
+            cursor.executemany("DELETE FROM allowed WHERE plate = ?", stale)
+            removed = len(stale)
+        cursor.executemany("INSERT OR IGNORE INTO allowed (plate) VALUES (?)", ((plate,) for plate in plates))
+        added = cursor.rowcount
+        cursor.execute("SELECT version FROM allowed_version WHERE id = 1")
+        version = cursor.fetchone()[0]
+        _trim_journal(cursor, version)
+        conn.commit()
+    # The version moved, so this reloads the resident index
+    sync_allowed_plates(force=True)
+    return jsonify({**result, 'status': 'imported', 'added': added, 'removed': removed,
+                    'unchanged': len(plates) - added, 'version': version})
+
+def _export_chunks(plates, fmt, chunk=1000):
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(['plate'])
+        write = lambda plate: writer.writerow([plate])
+    else:
+        write = lambda plate: buffer.write(json.dumps({'plate': plate}, ensure_ascii=False) + "\n")
+    for i, plate in enumerate(plates, 1):
+        write(plate)
+        if i % chunk == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def export_plates(request):
+    # Streams the resident index as ?format=csv|jsonl; the version is the ETag
+    try:
+        fmt = _plate_format(request)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    sync_allowed_plates(force=True)
+    with _sync_lock:
+        version = _allowed_version
+        if request.if_none_match.contains(_plates_etag(version)):
+            return _not_modified(_plates_etag(version))
+        plates = allowed_plates.plates()
+    response = Response(_export_chunks(plates, fmt), mimetype=PLATE_FORMATS[fmt],
+                        headers={'Content-Disposition': f'attachment; filename=plates.{fmt}'})
+    response.set_etag(_plates_etag(version))
+    return response
+
+class LogQueryError(ValueError):
+    pass
 
-def get_barrier_log():
-    with sqlite3.connect("allowed_plates.db") as conn:
+def _encode_cursor(timestamp, kind, row_id):
+    raw = json.dumps([timestamp, kind, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def _decode_cursor(value):
+    try:
+        timestamp, kind, row_id = json.loads(base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)))
+        return str(timestamp), str(kind), int(row_id)
+    except (ValueError, TypeError):
+        raise LogQueryError("invalid cursor")
+
+def _parse_timestamp(value, name):
+    # Accepts a date, or a date and time with ' ' or 'T'; stored timestamps are UTC
+    try:
+        parsed = datetime.fromisoformat(value.strip().rstrip('Z'))
+    except ValueError:
+        raise LogQueryError(f"{name} must be an ISO date or date-time")
+    return parsed.strftime('%Y-%m-%d %H:%M:%S')
+
+def _log_query_args(request):
+    args = request.args
+    try:
+        limit = int(args.get('limit', config.LOG_PAGE_SIZE))
+    except ValueError:
+        raise LogQueryError("limit must be an integer")
+    return {
+        'limit': max(1, min(limit, config.LOG_MAX_PAGE_SIZE)),
+        'cursor': _decode_cursor(args['cursor']) if args.get('cursor') else None,
+        'since': _parse_timestamp(args['since'], 'since') if args.get('since') else None,
+        'until': _parse_timestamp(args['until'], 'until') if args.get('until') else None,
+        'plate': normalize_plate(args.get('plate', '')) or None,
+        'status': args.get('status') or None,
+        'lane': args.get('lane') or None,
+    }
+
+def _log_filters(kind, query, plate_column=True):
+    # WHERE clause for one log table, newest first, resuming after query['cursor']
+    where, params = [], []
+    if query['since']:
+        where.append("timestamp >= ?")
+        params.append(query['since'])
+    if query['until']:
+        where.append("timestamp < ?")
+        params.append(query['until'])
+    if query['plate'] and plate_column:
+        where.append("plate = ?")
+        params.append(query['plate'])
+    if query['status']:
+        where.append("status = ?")
+        params.append(query['status'])
+    if query['lane']:
+        where.append("lane = ?")
+        params.append(query['lane'])
+    if query['cursor']:
+        timestamp, cursor_kind, row_id = query['cursor']
+        # Rows sort by (timestamp, id, kind) descending, following the (timestamp, id)
+        # indexes; kind only breaks ties between the two tables in the timeline
+        where.append("(timestamp, id) <= (?, ?)" if kind < cursor_kind else "(timestamp, id) < (?, ?)")
+        params += [timestamp, row_id]
+    return (" WHERE " + " AND ".join(where) if where else ""), params
+
+def _query_log(sql, params, limit):
+    get_log_writer().flush()
+    with sqlite3.connect(config.DB_PATH) as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT status, timestamp FROM barrier_log ORDER BY timestamp DESC LIMIT 100")
+        # One extra row tells whether there is a next page
+        cursor.execute(sql + " LIMIT ?", params + [limit + 1])
         rows = cursor.fetchall()
-    return jsonify({'log': rows}) 
\ No newline at end of file
+    return rows[:limit], len(rows) > limit
+
+def get_log(request):
+    try:
+        query = _log_query_args(request)
+    except LogQueryError as e:
+        return jsonify({'error': str(e)}), 400
+    where, params = _log_filters('access', query)
+    rows, more = _query_log("SELECT plate, status, timestamp, id FROM access_log" + where +
+                            " ORDER BY timestamp DESC, id DESC", params, query['limit'])
+    next_cursor = _encode_cursor(rows[-1][2], 'access', rows[-1][3]) if more else None
+    return jsonify({'log': [row[:3] for row in rows], 'next_cursor': next_cursor})
+
+def get_barrier_log(request):
+    try:
+        query = _log_query_args(request)
+    except LogQueryError as e:
+        return jsonify({'error': str(e)}), 400
+    # Barrier rows have no plate, so ?plate is ignored here
+    where, params = _log_filters('barrier', query, plate_column=False)
+    rows, more = _query_log("SELECT status, timestamp, id FROM barrier_log" + where +
+                            " ORDER BY timestamp DESC, id DESC", params, query['limit'])
+    next_cursor = _encode_cursor(rows[-1][1], 'barrier', rows[-1][2]) if more else None
+    return jsonify({'log': [row[:2] for row in rows], 'next_cursor': next_cursor})
+
+def get_timeline(request):
+    # Access and barrier events in one newest-first stream, merged by SQLite from both indexes
+    try:
+        query = _log_query_args(request)
+    except LogQueryError as e:
+        return jsonify({'error': str(e)}), 400
+    access_where, access_params = _log_filters('access', query)
+    selects = ["SELECT timestamp, 'access' AS kind, id, plate, status, lane FROM access_log" + access_where]
+    params = access_params
+    if not query['plate']:
+        # Barrier rows have no plate, so a plate filter leaves only access rows
+        barrier_where, barrier_params = _log_filters('barrier', query, plate_column=False)
+        selects.append("SELECT timestamp, 'barrier', id, NULL, status, lane FROM barrier_log" + barrier_where)
+        params += barrier_params
+    rows, more = _query_log(" UNION ALL ".join(selects) + " ORDER BY 1 DESC, 3 DESC, 2 DESC",
+                            params, query['limit'])
+    events = [{'timestamp': timestamp, 'kind': kind, 'plate': plate, 'status': status, 'lane': lane}
+              for timestamp, kind, _, plate, status, lane in rows]
+    next_cursor = _encode_cursor(*rows[-1][:3]) if more else None
+    return jsonify({'log': events, 'next_cursor': next_cursor})
@@ -0,0 +1,312 @@
+"""Plate detector backends.
+
+ultralytics runs models/best.pt through PyTorch, as before. onnxruntime and
+openvino run the same network exported to ONNX (optionally INT8-quantized)
+with our own letterbox preprocessing and NMS, which is much cheaper on the
+CPU-only gate boxes. Export the model once with:
+
+    python detector.py [--input-size 640] [--int8 --calibration frames/]
+
+onnxruntime and openvino are optional; install the one you select with
+DETECTOR_BACKEND.
+"""
+import argparse
+import os
+import threading
+
+import cv2
+import numpy as np
+import config
+
+DETECTOR_BACKENDS = ('ultralytics', 'onnxruntime', 'openvino', 'stub')
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+# Same as ultralytics: cap on boxes per image, and the class offset used for per-class NMS
+MAX_DETECTIONS = 300
+MAX_WH = 7680
+# Blank gate-sized frame run once through a new detector so the first request does not pay for it
+WARMUP_FRAME = np.zeros((480, 640, 3), dtype=np.uint8)
+
+
+def empty_detections():
+    return np.empty((0, 5), dtype=np.float32)
+
+
+def letterbox(image, size):
+    """Scales image to fit a size x size square, or a (height, width) rectangle, padded with grey like ultralytics."""
+    h, w = image.shape[:2]
+    out_h, out_w = (size, size) if isinstance(size, int) else size
+    scale = min(out_h / h, out_w / w)
+    new_w, new_h = round(w * scale), round(h * scale)
+    if (new_w, new_h) != (w, h):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    left, top = (out_w - new_w) // 2, (out_h - new_h) // 2
+    canvas = np.full((out_h, out_w, 3), 114, dtype=np.uint8)
+    canvas[top:top + new_h, left:left + new_w] = image
+    return canvas, scale, (left, top)
+
+
+def nms(boxes, scores, iou_threshold):
+    """Greedy non-maximum suppression; returns the indices of the kept boxes."""
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        x1 = np.maximum(boxes[i, 0], boxes[rest, 0])
+        y1 = np.maximum(boxes[i, 1], boxes[rest, 1])
+        x2 = np.minimum(boxes[i, 2], boxes[rest, 2])
+        y2 = np.minimum(boxes[i, 3], boxes[rest, 3])
+        inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+        overlap = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[overlap <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def decode(prediction, scale, pad, shape, conf, iou_threshold):
+    """Turns one image's raw YOLOv8 output, (4 + classes) x anchors, into x1, y1, x2, y2, conf rows."""
+    prediction = prediction.T
+    class_scores = prediction[:, 4:]
+    classes = class_scores.argmax(axis=1)
+    scores = class_scores[np.arange(len(classes)), classes]
+    mask = scores >= conf
+    if not mask.any():
+        return empty_detections()
+    prediction, scores, classes = prediction[mask], scores[mask], classes[mask]
+
+    cx, cy, w, h = prediction[:, 0], prediction[:, 1], prediction[:, 2], prediction[:, 3]
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    # Offsetting boxes by class keeps NMS from suppressing across classes
+    keep = nms(boxes + (classes * MAX_WH)[:, None], scores, iou_threshold)[:MAX_DETECTIONS]
+    boxes, scores = boxes[keep], scores[keep]
+
+    boxes -= (pad[0], pad[1], pad[0], pad[1])
+    boxes /= scale
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, shape[0])
+    return np.hstack([boxes, scores[:, None]]).astype(np.float32)
+
+
+class UltralyticsDetector:
+    def __init__(self, model_path, input_size=config.DETECTOR_INPUT_SIZE, conf=config.DETECTOR_CONF,
+                 iou=config.DETECTOR_IOU, threads=config.DETECTOR_THREADS):
+        from ultralytics import YOLO
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        self.input_size = input_size
+        self.conf = conf
+        self.iou = iou
+        self._model = YOLO(model_path)
+
+    def detect(self, images, input_size=None):
+        results = self._model(images, imgsz=input_size or self.input_size, conf=self.conf, iou=self.iou,
+                              verbose=False)
+        detections = []
+        for r in results:
+            if r.boxes is None:
+                detections.append(empty_detections())
+                continue
+            # x1, y1, x2, y2, confidence
+            detections.append(np.hstack([r.boxes.xyxy.cpu().numpy(),
+                                         r.boxes.conf.cpu().numpy().reshape(-1, 1)]))
+        return detections
+
+
+class ExportedDetector:
+    """Base for runtimes that execute the exported ONNX graph; subclasses provide _infer."""
+
+    # Set by subclasses when the exported graph only takes one image per call,
+    # or only the input size it was exported with
+    fixed_batch = False
+    fixed_size = False
+
+    def __init__(self, input_size=config.DETECTOR_INPUT_SIZE, conf=config.DETECTOR_CONF,
+                 iou=config.DETECTOR_IOU):
+        self.input_size = input_size
+        self.conf = conf
+        self.iou = iou
+
+    def _infer(self, blob):
+        raise NotImplementedError
+
+    def detect(self, images, input_size=None):
+        # input_size overrides the square size per call, as an int or a (height, width) pair
+        size = self.input_size if self.fixed_size or not input_size else input_size
+        boxed = [letterbox(image, size) for image in images]
+        blob = cv2.dnn.blobFromImages([canvas for canvas, _, _ in boxed], 1 / 255,
+                                      swapRB=True)
+        if self.fixed_batch:
+            output = np.concatenate([self._infer(blob[i:i + 1]) for i in range(len(blob))])
+        else:
+            output = self._infer(blob)
+        return [decode(prediction, scale, pad, image.shape, self.conf, self.iou)
+                for prediction, (_, scale, pad), image in zip(output, boxed, images)]
+
+
+class ONNXRuntimeDetector(ExportedDetector):
+    def __init__(self, model_path, threads=config.DETECTOR_THREADS, **kwargs):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        model_input = self._session.get_inputs()[0]
+        self._input_name = model_input.name
+        self.fixed_batch = model_input.shape[0] == 1
+        if isinstance(model_input.shape[2], int):
+            # A static graph only accepts the size it was exported with
+            kwargs['input_size'] = model_input.shape[2]
+            self.fixed_size = True
+        super().__init__(**kwargs)
+
+    def _infer(self, blob):
+        return self._session.run(None, {self._input_name: blob})[0]
+
+
+class OpenVINODetector(ExportedDetector):
+    def __init__(self, model_path, threads=config.DETECTOR_THREADS, **kwargs):
+        import openvino as ov
+        core = ov.Core()
+        model = core.read_model(model_path)
+        model_input = model.input(0).get_partial_shape()
+        self.fixed_batch = model_input[0].is_static and model_input[0].get_length() == 1
+        if model_input[2].is_static:
+            kwargs['input_size'] = model_input[2].get_length()
+            self.fixed_size = True
+        properties = {'PERFORMANCE_HINT': 'LATENCY'}
+        if threads:
+            properties['INFERENCE_NUM_THREADS'] = threads
+        self._compiled = core.compile_model(model, 'CPU', properties)
+        self._output = self._compiled.output(0)
+        super().__init__(**kwargs)
+
+    def _infer(self, blob):
+        return self._compiled([blob])[self._output]
+
+
+class StubDetector:
+    """Weight-free stand-in for benchmarking the pipeline where the model is not available.
+
+    Boxes bright, plate-shaped regions found with a threshold and contours.
+    """
+
+    def __init__(self, model_path=None, **kwargs):
+        pass
+
+    def _detect(self, image):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        _, mask = cv2.threshold(gray, 180, 255, cv2.THRESH_BINARY)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        rows = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if h >= 20 and 2 <= w / h <= 6:
+                rows.append((x, y, x + w, y + h, 0.5))
+        return np.array(rows[:MAX_DETECTIONS], dtype=np.float32).reshape(-1, 5)
+
+    def detect(self, images, input_size=None):
+        return [self._detect(image) for image in images]
+
+
+def default_model_path(backend):
+    return os.path.join(MODELS_DIR, "best.pt" if backend == 'ultralytics' else "best.onnx")
+
+
+def create_detector(backend=config.DETECTOR_BACKEND, model_path=config.DETECTOR_MODEL, **kwargs):
+    if backend not in DETECTOR_BACKENDS:
+        raise ValueError(f"Unknown detector backend: {backend}")
+    if not model_path:
+        model_path = default_model_path(backend)
+    elif not os.path.isabs(model_path):
+        model_path = os.path.join(MODELS_DIR, model_path)
+    if backend == 'stub':
+        return StubDetector(model_path, **kwargs)
+    if backend == 'ultralytics':
+        return UltralyticsDetector(model_path, **kwargs)
+    if backend == 'onnxruntime':
+        return ONNXRuntimeDetector(model_path, **kwargs)
+    return OpenVINODetector(model_path, **kwargs)
+
+
+_detector = None
+_detector_lock = threading.Lock()
+
+
+def get_detector():
+    global _detector
+    with _detector_lock:
+        if _detector is None:
+            detector = create_detector()
+            detector.detect([WARMUP_FRAME])
+            _detector = detector
+    return _detector
+
+
+def init_detector():
+    get_detector()
+
+
+def detector_ready():
+    return _detector is not None
+
+
+def export_onnx(weights, input_size=config.DETECTOR_INPUT_SIZE):
+    # Dynamic axes so the micro-batcher can send several frames per call
+    from ultralytics import YOLO
+    return YOLO(weights).export(format='onnx', imgsz=input_size, dynamic=True, simplify=True)
+
+
+def quantize_int8(onnx_path, output_path, calibration_dir, input_size=config.DETECTOR_INPUT_SIZE,
+                  limit=200):
+    """Static INT8 quantization, calibrated on real gate frames from calibration_dir."""
+    import onnxruntime as ort
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_static)
+
+    input_name = ort.InferenceSession(onnx_path, providers=['CPUExecutionProvider']).get_inputs()[0].name
+    paths = sorted(os.path.join(calibration_dir, name) for name in os.listdir(calibration_dir)
+                   if name.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')))[:limit]
+    if not paths:
+        raise SystemExit(f"No calibration images in {calibration_dir}")
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self._paths = iter(paths)
+
+        def get_next(self):
+            for path in self._paths:
+                image = cv2.imread(path, cv2.IMREAD_COLOR)
+                if image is not None:
+                    canvas, _, _ = letterbox(image, input_size)
+                    return {input_name: cv2.dnn.blobFromImage(canvas, 1 / 255, swapRB=True)}
+            return None
+
+    quantize_static(onnx_path, output_path, FrameReader(), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True)
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the plate detector to ONNX")
+    parser.add_argument('--weights', default=default_model_path('ultralytics'))
+    parser.add_argument('--input-size', type=int, default=config.DETECTOR_INPUT_SIZE)
+    parser.add_argument('--int8', action='store_true', help='also write an INT8-quantized model')
+    parser.add_argument('--calibration', help='directory of gate frames used to calibrate --int8')
+    args = parser.parse_args()
+    if args.int8 and not args.calibration:
+        parser.error('--int8 needs --calibration DIR')
+
+    onnx_path = export_onnx(args.weights, args.input_size)
+    print(f"Exported {onnx_path}")
+    if args.int8:
+        int8_path = os.path.splitext(onnx_path)[0] + "_int8.onnx"
+        quantize_int8(onnx_path, int8_path, args.calibration, args.input_size)
+        print(f"Quantized {int8_path}")
+
+
+if __name__ == '__main__':
+    main()
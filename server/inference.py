@@ -0,0 +1,116 @@
+import queue
+import threading
+from concurrent.futures import CancelledError, Future, TimeoutError as FutureTimeoutError
+import config
+
+
+class InferenceBusyError(RuntimeError):
+    pass
+
+
+class InferenceTimeoutError(RuntimeError):
+    pass
+
+
+class InferenceExecutor:
+    """Dedicated threads that run detection/OCR on behalf of request threads.
+
+    Requests are admitted into a bounded queue and rejected at once when it
+    is full, and the caller waits for its result only until its deadline.
+    A request that times out while still queued is cancelled and never runs.
+    Since inference never runs on the request threads, routes such as
+    /barrier_status and /list_plates do not queue behind it.
+    """
+
+    def __init__(self, workers=config.INFERENCE_WORKERS, queue_size=config.INFERENCE_QUEUE_SIZE):
+        self.workers = workers
+        self._tasks = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _ensure_workers(self):
+        # Started on first use, and again in a forked child where the parent's threads are gone
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for i in range(len(self._threads), self.workers):
+                thread = threading.Thread(target=self._worker, name=f"inference-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _worker(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                break
+            fn, args, future = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self._stats_lock:
+                self._running += 1
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._stats_lock:
+                    self._running -= 1
+                    self.completed += 1
+
+    def submit(self, fn, *args):
+        self._ensure_workers()
+        future = Future()
+        try:
+            self._tasks.put_nowait((fn, args, future))
+        except queue.Full:
+            with self._stats_lock:
+                self.rejected += 1
+            raise InferenceBusyError("Inference queue is full")
+        return future
+
+    def run(self, fn, *args, timeout=config.RECOGNIZE_TIMEOUT):
+        future = self.submit(fn, *args)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # Only a task still waiting in the queue can be cancelled; a running one finishes unobserved
+            future.cancel()
+            with self._stats_lock:
+                self.timed_out += 1
+            raise InferenceTimeoutError(f"Inference took longer than {timeout}s")
+        except CancelledError:
+            raise InferenceBusyError("Inference is shutting down")
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'workers': self.workers,
+                'queue_depth': self._tasks.qsize(),
+                'running': self._running,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            # Queued requests are dropped (their callers get a 503) so the sentinels fit
+            while True:
+                try:
+                    task = self._tasks.get_nowait()
+                except queue.Empty:
+                    break
+                if task is not None:
+                    task[2].cancel()
+            for _ in self._threads:
+                self._tasks.put(None)
+            for thread in self._threads:
+                thread.join()
+            self._threads = []
+
+
+inference_executor = InferenceExecutor()
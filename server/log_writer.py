@@ -0,0 +1,174 @@
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+import config
+from stages import stage
+
+ACCESS_INSERT = "INSERT INTO access_log (plate, status, timestamp, lane) VALUES (?, ?, ?, ?)"
+BARRIER_INSERT = "INSERT INTO barrier_log (status, timestamp, lane) VALUES (?, ?, ?)"
+
+
+def utc_timestamp():
+    # Same format as SQLite's CURRENT_TIMESTAMP, taken when the event happens
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+
+
+class LogWriter:
+    """Background thread that writes log rows in batched transactions.
+
+    Callers only enqueue; rows are flushed every flush_interval seconds or
+    once max_batch rows are pending, whichever comes first. A batch that
+    finds the database locked is retried with backoff, and kept for the
+    next batch if it still cannot be written.
+    """
+
+    def __init__(self, db_path=config.DB_PATH, flush_interval=config.LOG_FLUSH_INTERVAL,
+                 max_batch=config.LOG_MAX_BATCH):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self._backlog = []
+        self.written = 0
+
+    def start(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._worker.start()
+
+    def write(self, sql, params):
+        self._queue.put((sql, params))
+
+    def flush(self, timeout=config.LOG_FLUSH_TIMEOUT):
+        # Waits until everything enqueued before this call is committed; False if that did
+        # not happen within timeout, or there is no worker to do it
+        worker = self._worker
+        if worker is None or not worker.is_alive():
+            return False
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, timeout=config.LOG_DB_TIMEOUT)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.OperationalError as e:
+            # init_db already switched the database to WAL; this is only a safeguard
+            print(f"[log-writer] could not set WAL mode: {e}")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        stop = False
+        waiting = []
+        while not stop:
+            rows, waiters, stop = self._collect()
+            if rows or self._backlog:
+                self._commit(conn, rows)
+            waiting += waiters
+            if not self._backlog:
+                # Flushes return once their rows are committed, not merely attempted
+                for done in waiting:
+                    done.set()
+                waiting = []
+        for done in waiting:
+            done.set()
+        conn.close()
+        if self._backlog:
+            print(f"[log-writer] dropped {len(self._backlog)} rows at shutdown")
+
+    def _collect(self):
+        rows, waiters = [], []
+        try:
+            # With rows left over from a locked database, come back to them soon
+            task = self._queue.get(timeout=self.flush_interval if self._backlog else None)
+        except queue.Empty:
+            return rows, waiters, False
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            if task is None:
+                return rows, waiters, True
+            if isinstance(task, threading.Event):
+                # A flush request ends the batch early
+                waiters.append(task)
+                return rows, waiters, False
+            rows.append(task)
+            remaining = deadline - time.monotonic()
+            if len(rows) >= self.max_batch or remaining <= 0:
+                return rows, waiters, False
+            try:
+                task = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return rows, waiters, False
+
+    def _commit(self, conn, rows):
+        rows = self._backlog + rows
+        self._backlog = []
+        grouped = {}
+        for sql, params in rows:
+            grouped.setdefault(sql, []).append(params)
+        delay = 0.1
+        for attempt in range(config.LOG_WRITE_RETRIES + 1):
+            try:
+                with stage('db_log_write'), conn:
+                    for sql, params in grouped.items():
+                        conn.executemany(sql, params)
+                self.written += len(rows)
+                return
+            except sqlite3.OperationalError as e:
+                # Other workers, barrier writes and retention batches all take the write lock
+                if 'locked' not in str(e) and 'busy' not in str(e):
+                    print(f"[log-writer] dropped {len(rows)} rows: {e}")
+                    return
+                error = e
+                if attempt < config.LOG_WRITE_RETRIES:
+                    time.sleep(delay)
+                    delay *= 2
+            except sqlite3.Error as e:
+                print(f"[log-writer] dropped {len(rows)} rows: {e}")
+                return
+        print(f"[log-writer] {len(rows)} rows kept for the next batch: {error}")
+        self._backlog = rows
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def shutdown(self):
+        with self._lock:
+            if self._worker is not None:
+                self._queue.put(None)
+                self._worker.join()
+                self._worker = None
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_log_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            writer = LogWriter()
+            writer.start()
+            # Drain whatever is still queued when the process exits
+            atexit.register(writer.shutdown)
+            _writer = writer
+    return _writer
+
+
+def shutdown_log_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.shutdown()
+            _writer = None
+
+
+def log_pending():
+    # Without starting a writer just to ask
+    writer = _writer
+    return writer.pending() if writer is not None else 0
@@ -1,14 +1,180 @@
 import cv2
 import numpy as np
-from paddleocr import PaddleOCR
-import gc
+import queue
+import threading
+from concurrent.futures import Future
+import config
+
+# Small blank plate-sized image used to warm up the detection/recognition weights
+WARMUP_IMAGE = np.full((48, 160, 3), 255, dtype=np.uint8)
+
+
+class OCRBusyError(RuntimeError):
+    pass
+
+
+class StubOCR:
+    """Stands in for PaddleOCR (OCR_ENGINE=stub) to benchmark the pipeline without its models.
+
+    Reads every crop as OCR_STUB_TEXT, in PaddleOCR's result format.
+    """
+
+    def ocr(self, image, cls=False):
+        h, w = image.shape[:2]
+        return [[[[[0, 0], [w, 0], [w, h], [0, h]], (config.OCR_STUB_TEXT, 0.9)]]]
+
+
+def create_ocr_model():
+    if config.OCR_ENGINE == 'stub':
+        return StubOCR()
+    # Imported here: paddle takes seconds to import and the server should start without it
+    from paddleocr import PaddleOCR
+    return PaddleOCR(use_angle_cls=False, lang='en', show_log=False)
+
+
+class OCRPool:
+    """Fixed set of warm PaddleOCR instances, one per worker thread.
+
+    PaddleOCR predictors are not thread-safe, so every worker owns its own
+    instance and takes crops from a shared bounded queue.
+    """
+
+    def __init__(self, size=config.OCR_POOL_SIZE, queue_size=config.OCR_QUEUE_SIZE,
+                 model_factory=create_ocr_model):
+        self.size = size
+        self._model_factory = model_factory
+        self._tasks = queue.Queue(maxsize=queue_size)
+        self._workers = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self):
+        with self._lock:
+            if self._workers:
+                return
+            started = []
+            for i in range(self.size):
+                ready = threading.Event()
+                errors = []
+                worker = threading.Thread(target=self._worker, args=(ready, errors),
+                                          name=f"ocr-{i}", daemon=True)
+                worker.start()
+                started.append((worker, ready, errors))
+            failures = []
+            for worker, ready, errors in started:
+                ready.wait()
+                failures.extend(errors)
+            if failures:
+                # The engines that did load would otherwise wait on the queue forever
+                self._stop([worker for worker, _, errors in started if not errors])
+                raise failures[0]
+            self._workers = [worker for worker, _, _ in started]
+
+    def _worker(self, ready, errors):
+        try:
+            model = self._model_factory()
+            model.ocr(WARMUP_IMAGE, cls=False)
+        except Exception as e:
+            errors.append(e)
+            ready.set()
+            return
+        ready.set()
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                break
+            image, future = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(model.ocr(image, cls=False))
+            except Exception as e:
+                future.set_exception(e)
+
+    def submit(self, image, timeout=config.OCR_QUEUE_TIMEOUT):
+        if self._closed:
+            raise OCRBusyError("OCR is shutting down")
+        future = Future()
+        try:
+            self._tasks.put((image, future), timeout=timeout)
+        except queue.Full:
+            raise OCRBusyError("OCR queue is full")
+        return future
+
+    def run(self, image):
+        return self.submit(image).result()
+
+    def queue_depth(self):
+        return self._tasks.qsize()
+
+    def _stop(self, workers):
+        self._closed = True
+        # Crops still queued fail with OCRBusyError (a 503), which leaves room for the sentinels
+        while True:
+            try:
+                task = self._tasks.get_nowait()
+            except queue.Empty:
+                break
+            if task is not None:
+                task[1].set_exception(OCRBusyError("OCR is shutting down"))
+        for _ in workers:
+            try:
+                self._tasks.put(None, timeout=config.OCR_QUEUE_TIMEOUT)
+            except queue.Full:
+                # Workers stuck on a crop: they are daemons, do not hang the exit on them
+                return
+        for worker in workers:
+            worker.join()
+
+    def shutdown(self):
+        with self._lock:
+            self._stop(self._workers)
+            self._workers = []
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_ocr_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            pool = OCRPool()
+            pool.start()
+            _pool = pool
+    return _pool
+
+
+def init_ocr():
+    get_ocr_pool()
+
+
+def shutdown_ocr():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def ocr_ready():
+    return _pool is not None
+
+
+def ocr_queue_depth():
+    pool = _pool
+    return pool.queue_depth() if pool is not None else 0
+
 
 def run_ocr(processed_image):
-    ocr_model = PaddleOCR(use_angle_cls=False, lang='en', show_log=False)
-    result = ocr_model.ocr(processed_image, cls=False)
-    del ocr_model
-    gc.collect()
-    return result
+    return get_ocr_pool().run(processed_image)
+
+
+def submit_ocr(processed_image):
+    # PaddleOCR takes one image per det+rec call, so crops go straight to the pool queue,
+    # where the next free engine picks them up; returns a Future
+    return get_ocr_pool().submit(processed_image)
 
 def resize_for_ocr(img, scale=3):
     return cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
@@ -19,4 +185,4 @@ def enhance_contrast(img):
     adaptive = cv2.adaptiveThreshold(
         blur, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 15, 11
     )
-    return cv2.cvtColor(adaptive, cv2.COLOR_GRAY2BGR) 
\ No newline at end of file
+    return cv2.cvtColor(adaptive, cv2.COLOR_GRAY2BGR)
@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import OrderedDict
+import cv2
+import numpy as np
+import config
+
+
+def dhash(gray, width=config.OCR_CACHE_HASH_WIDTH, height=config.OCR_CACHE_HASH_HEIGHT):
+    # Difference hash: one bit per horizontally adjacent pixel pair of a tiny copy.
+    # Plates are wide, so the grid is too; 32x8 keeps about four columns per character.
+    small = cv2.resize(gray, (width + 1, height), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def thumbnail(gray, size=(64, 16)):
+    # Zero-mean, unit-norm thumbnail: the dot product of two is their correlation
+    small = cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+    small -= small.mean()
+    return small / (np.linalg.norm(small) + 1e-6)
+
+
+def fingerprint(crop):
+    gray = crop if crop.ndim == 2 else cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    return dhash(gray), thumbnail(gray)
+
+
+def similar(a, b, max_distance=config.OCR_CACHE_MAX_DISTANCE,
+            min_similarity=config.OCR_CACHE_MIN_SIMILARITY):
+    # The cache's test for two fingerprints: close dHashes, confirmed by thumbnail correlation
+    return (a[0] ^ b[0]).bit_count() <= max_distance and float((a[1] * b[1]).sum()) >= min_similarity
+
+
+class OCRCache:
+    """OCR results of recent plate crops, found by perceptual hash.
+
+    A crop whose dHash is within max_distance bits of a cached one is a
+    candidate. dHash alone cannot tell one changed character from sensor
+    noise, so the candidate is confirmed by correlating small thumbnails
+    before its result is reused. Entries expire ttl seconds after they were
+    stored; the least recently used one goes once max_size is reached.
+    """
+
+    def __init__(self, max_size=config.OCR_CACHE_SIZE, ttl=config.OCR_CACHE_TTL,
+                 max_distance=config.OCR_CACHE_MAX_DISTANCE,
+                 min_similarity=config.OCR_CACHE_MIN_SIMILARITY):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.min_similarity = min_similarity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _purge(self, now):
+        expired = [key for key, (stored, _, _) in self._entries.items() if now - stored > self.ttl]
+        for key in expired:
+            del self._entries[key]
+        self.evictions += len(expired)
+
+    def get(self, fp):
+        if not self.max_size:
+            return None
+        key, thumb = fp
+        with self._lock:
+            self._purge(time.monotonic())
+            best, best_similarity = None, self.min_similarity
+            for cached, (_, cached_thumb, _) in self._entries.items():
+                if (cached ^ key).bit_count() > self.max_distance:
+                    continue
+                similarity = float((thumb * cached_thumb).sum())
+                if similarity >= best_similarity:
+                    best, best_similarity = cached, similarity
+            if best is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best)
+            self.hits += 1
+            return self._entries[best][2]
+
+    def put(self, fp, result):
+        if not self.max_size:
+            return
+        key, thumb = fp
+        with self._lock:
+            self._entries[key] = (time.monotonic(), thumb, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+            }
+
+
+ocr_cache = OCRCache()
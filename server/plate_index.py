@@ -0,0 +1,102 @@
+import threading
+from functools import lru_cache
+from rapidfuzz import process
+from rapidfuzz.distance import Levenshtein
+import config
+
+
+@lru_cache(maxsize=None)
+def _segments(length, parts):
+    # Split range(length) into `parts` nearly equal (start, end) pieces
+    bounds = [length * i // parts for i in range(parts + 1)]
+    return tuple(zip(bounds[:-1], bounds[1:]))
+
+
+class PlateIndex:
+    """In-memory copy of the allowed table used on the recognition path.
+
+    Exact matches are a set lookup. Fuzzy matches use a pigeonhole filter:
+    every plate is cut into max_dist + 1 segments, and any string within
+    max_dist edits still contains one of them, shifted by at most max_dist
+    characters. Only plates sharing such a segment are verified with
+    RapidFuzz's C Levenshtein, so a lookup never scans the whole table.
+    """
+
+    def __init__(self, max_dist=config.PLATE_MAX_DISTANCE):
+        self.max_dist = max_dist
+        self._lock = threading.Lock()
+        self._plates = set()
+        self._segments = {}
+
+    def _keys(self, plate):
+        n = len(plate)
+        for i, (start, end) in enumerate(_segments(n, self.max_dist + 1)):
+            yield n, i, plate[start:end]
+
+    def _insert(self, plate):
+        if plate in self._plates:
+            return
+        self._plates.add(plate)
+        for key in self._keys(plate):
+            self._segments.setdefault(key, set()).add(plate)
+
+    def load(self, plates):
+        # Built aside and swapped in, so lookups keep running on the old copy meanwhile
+        fresh = PlateIndex(self.max_dist)
+        for plate in plates:
+            fresh._insert(plate)
+        with self._lock:
+            self._plates = fresh._plates
+            self._segments = fresh._segments
+
+    def add(self, plate):
+        with self._lock:
+            self._insert(plate)
+
+    def remove(self, plate):
+        with self._lock:
+            if plate not in self._plates:
+                return
+            self._plates.discard(plate)
+            for key in self._keys(plate):
+                group = self._segments.get(key)
+                if group is not None:
+                    group.discard(plate)
+                    if not group:
+                        del self._segments[key]
+
+    def plates(self):
+        with self._lock:
+            return sorted(self._plates)
+
+    def __len__(self):
+        return len(self._plates)
+
+    def __contains__(self, plate):
+        return plate in self._plates
+
+    def _candidates(self, plate):
+        k = self.max_dist
+        found = set()
+        for n in range(max(1, len(plate) - k), len(plate) + k + 1):
+            for i, (start, end) in enumerate(_segments(n, k + 1)):
+                for shift in range(-k, k + 1):
+                    lo = start + shift
+                    if lo < 0 or lo + end - start > len(plate):
+                        continue
+                    group = self._segments.get((n, i, plate[lo:lo + end - start]))
+                    if group:
+                        found |= group
+        return found
+
+    def lookup(self, plate):
+        with self._lock:
+            if plate in self._plates:
+                return plate
+            candidates = self._candidates(plate)
+        if not candidates:
+            return None
+        # Sorted so that ties between equally close plates resolve the same way every time
+        found = process.extractOne(plate, sorted(candidates), scorer=Levenshtein.distance,
+                                   score_cutoff=self.max_dist)
+        return found[0] if found is not None else None
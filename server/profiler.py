@@ -0,0 +1,101 @@
+"""Opt-in sampling profiler that keeps the stacks of the N slowest requests.
+
+While at least one request is in flight, a sampler thread snapshots the
+stacks of all busy threads every PROFILE_INTERVAL_MS. The samples are
+credited to every request in flight at that moment, because the work of a
+request runs on the inference, batcher and OCR threads, not on the thread
+that serves it. With concurrent requests, each profile therefore also holds
+the work of its neighbours.
+
+GET /debug/profile returns the kept profiles in the folded-stack format
+that flamegraph.pl, speedscope and inferno read directly.
+"""
+import heapq
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+import config
+
+# Innermost frames of threads that are only waiting for work
+IDLE_FRAMES = {('threading.py', 'wait'), ('queue.py', 'get'), ('selectors.py', 'select'),
+               ('socketserver.py', 'serve_forever'), ('threading.py', '_wait_for_tstate_lock')}
+
+
+def _fold(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def _idle(frame):
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+
+class SlowRequestProfiler:
+    def __init__(self, keep=config.PROFILE_SLOWEST, interval_ms=config.PROFILE_INTERVAL_MS):
+        self.keep = keep
+        self.interval = interval_ms / 1000
+        self._ids = itertools.count()
+        self._active = {}
+        self._slowest = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_sampler(self):
+        # Started on first use, and again in a forked child where the parent's thread is gone
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+            self._thread.start()
+
+    def begin(self):
+        with self._lock:
+            self._ensure_sampler()
+            token = next(self._ids)
+            self._active[token] = Counter()
+            return token
+
+    def end(self, token, label, seconds):
+        with self._lock:
+            samples = self._active.pop(token, None)
+            if samples is None:
+                return
+            entry = (seconds, token, label, samples)
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, entry)
+            elif seconds > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def _sample(self):
+        me = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                stacks = [_fold(frame) for ident, frame in sys._current_frames().items()
+                          if ident != me and not _idle(frame)]
+                for samples in self._active.values():
+                    samples.update(stacks)
+
+    def folded(self):
+        """The kept profiles, slowest first, as 'request;stack;frames count' lines."""
+        with self._lock:
+            slowest = sorted(self._slowest, reverse=True)
+        lines = []
+        for seconds, _, label, samples in slowest:
+            root = f"{label} {seconds * 1000:.0f}ms".replace(";", ",").replace(" ", "_")
+            lines += [f"{root};{stack} {count}" for stack, count in samples.items()]
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._slowest = []
+
+
+profiler = SlowRequestProfiler() if config.PROFILE_SLOWEST else None
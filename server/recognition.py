@@ -2,24 +2,25 @@ import base64
 import cv2
 import numpy as np
 from flask import jsonify
-from ultralytics import YOLO
-from ocr import run_ocr, resize_for_ocr, enhance_contrast
-from db import log_access, is_plate_allowed
+from detector import get_detector, init_detector, detector_ready
+from ocr import submit_ocr, init_ocr, ocr_ready, ocr_queue_depth, OCRBusyError
+from preprocess import preprocessor
+from db import log_access, is_plate_allowed, claim_decision
+from log_writer import log_pending
+from batching import MicroBatcher
+from inference import inference_executor, InferenceBusyError, InferenceTimeoutError
+from barrier import get_barrier
+from tracking import get_tracker, tracker_stats
+from ocr_cache import ocr_cache, fingerprint
+from roi import get_lane_roi, roi_stats
+from stages import stage
+import config
 import re
-import os
-import requests
-import tkinter as tk
-import tkinter.messagebox as messagebox
+import time
 
-# Server configuration
-SERVER_URL = "http://localhost:5000"
-
-# Get the directory where this file is located
-current_dir = os.path.dirname(os.path.abspath(__file__))
-# Construct path to the model file
-model_path = os.path.join(current_dir, "models", "best.pt")
-
-model = YOLO(model_path)
+# decision: plate and verdict only; boxes: plus box coordinates for the client to draw;
+# thumbnail/full: plus the annotated frame, downscaled or at full size
+RESPONSE_MODES = ('decision', 'boxes', 'thumbnail', 'full')
 
 def is_probable_plate(text):
     text = text.replace(" ", "").upper()
@@ -28,83 +29,270 @@ def is_probable_plate(text):
 def clean_ocr_text(text):
     return text.replace("/", "I").replace("|", "I").replace("\\", "I").replace("]", "I").replace("[", "I")
 
-def recognize_plate(request):
-    data = request.get_json()
-    if 'image' not in data:
-        return jsonify({'error': 'No image provided'}), 400
+def _detect_batch(items):
+    # Items are (image, input shape); one detector call per input shape in the batch.
+    # Returns one x1, y1, x2, y2, confidence array per item
+    groups = {}
+    for i, (_, input_size) in enumerate(items):
+        groups.setdefault(input_size, []).append(i)
+    detections = [None] * len(items)
+    for input_size, indices in groups.items():
+        results = get_detector().detect([items[i][0] for i in indices], input_size)
+        for i, result in zip(indices, results):
+            detections[i] = result
+    return detections
 
-    image_data = base64.b64decode(data['image'])
-    nparr = np.frombuffer(image_data, np.uint8)
-    image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+detector_batcher = MicroBatcher('detector', _detect_batch,
+                                config.DETECT_MAX_BATCH, config.DETECT_MAX_WAIT_MS)
+
+def warmup():
+    # Loads and warms the detector and the OCR engines; requests would otherwise do it lazily
+    init_detector()
+    init_ocr()
+
+def readiness():
+    status = {'detector': detector_ready(), 'ocr': ocr_ready()}
+    status['ready'] = all(status.values())
+    return status
+
+def batch_stats():
+    return {'detector': detector_batcher.stats()}
+
+def pipeline_stats():
+    return {'inference': inference_executor.stats(), 'batching': batch_stats(),
+            'tracking': tracker_stats(), 'ocr_cache': ocr_cache.stats(), 'roi': roi_stats()}
+
+def pipeline_metrics():
+    # Gauges and counters for /metrics, read when it is scraped
+    inference = inference_executor.stats()
+    batching = batch_stats()
+    cache = ocr_cache.stats()
+    tracking = tracker_stats()
+    rois = roi_stats()
+    return [
+        ('anpr_queue_depth', 'gauge', 'Items waiting in each pipeline queue',
+         [({'queue': 'inference'}, inference['queue_depth']), ({'queue': 'ocr_engine'}, ocr_queue_depth())] +
+         [({'queue': f'{name}_batcher'}, stats['queue_depth']) for name, stats in batching.items()]),
+        ('anpr_inference_running', 'gauge', 'Frames being processed right now', [({}, inference['running'])]),
+        ('anpr_inference_requests_total', 'counter', 'Recognition requests by outcome',
+         [({'outcome': outcome}, inference[outcome]) for outcome in ('completed', 'rejected', 'timed_out')]),
+        ('anpr_batch_size_avg', 'gauge', 'Average micro-batch size',
+         [({'batcher': name}, stats['avg_batch_size']) for name, stats in batching.items()]),
+        ('anpr_ocr_cache_lookups_total', 'counter', 'OCR cache lookups by result',
+         [({'result': 'hit'}, cache['hits']), ({'result': 'miss'}, cache['misses'])]),
+        ('anpr_ocr_cache_hit_rate', 'gauge', 'OCR cache hits per lookup', [({}, cache['hit_rate'])]),
+        ('anpr_ocr_cache_entries', 'gauge', 'Entries in the OCR cache', [({}, cache['size'])]),
+        ('anpr_tracker_ocr_total', 'counter', 'Plate crops sent to OCR or skipped for locked tracks',
+         [({'lane': lane, 'result': result}, stats[f'ocr_{result}'])
+          for lane, stats in tracking.items() for result in ('runs', 'skipped')]),
+        ('anpr_roi_searches_total', 'counter', 'Detector searches of the lane ROI and of the grown ROI',
+         [({'lane': lane, 'window': window}, stats[key]) for lane, stats in rois.items()
+          for window, key in (('roi', 'frames'), ('expanded', 'expanded'))]),
+        ('anpr_log_pending', 'gauge', 'Log rows queued for the background writer', [({}, log_pending())]),
+    ]
+
+def plate_texts(ocr_result):
+    texts = []
+    if ocr_result and len(ocr_result) > 0:
+        for line in ocr_result[0] or []:
+            text = line[1][0]
+            # Прибираємо ':' з номера
+            text = text.replace(':', '')
+            text = text.replace('=', '')
+            texts.append(clean_ocr_text(text.replace(" ", "").upper()))
+    return texts
+
+ALLOWED_STATUS = "пропуск дозволений"
+DENIED_STATUS = "пропуск заборонений"
+
+def detect_plates(image, lane=None):
+    # Searches the lane's ROI, then the grown ROI if adaptive and nothing was found;
+    # the boxes come back in full-frame coordinates
+    roi = get_lane_roi(lane)
+    for attempt, ((x1, y1, x2, y2), input_size) in enumerate(roi.windows(image.shape)):
+        detections = detector_batcher.submit((image[y1:y2, x1:x2], input_size)).result()
+        roi.count(attempt, len(detections))
+        if len(detections):
+            break
+    detections[:, [0, 2]] += x1
+    detections[:, [1, 3]] += y1
+    return detections
+
+def process_frame(image, lane=None, deadline=None):
+    with stage('detect'):
+        detections = detect_plates(image, lane)
+    tracker = get_tracker(lane)
+    tracks = tracker.update([tuple(map(int, det[:4])) for det in detections])
+
+    boxes = []
+    pending = []
+    for det, track in zip(detections, tracks):
+        x1, y1, x2, y2 = map(int, det[:4])
+        boxes.append({'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2,
+                      'confidence': round(float(det[4]), 3), 'track': track.id})
+        plate_img = image[y1:y2, x1:x2]
+
+        if plate_img is None or plate_img.shape[0] < 40 or plate_img.shape[1] < 100:
+            continue
+
+        with stage('ocr_cache'):
+            crop_fp = fingerprint(plate_img)
+            settled = not track.needs_ocr(crop_fp)
+            # Only fresh reads are votes, so a track still collecting them skips the cache
+            cached = None if settled or not track.confirmed else ocr_cache.get(crop_fp)
+        if settled:
+            # Still the vehicle whose plate earlier frames settled
+            tracker.count_ocr(False)
+            continue
+        if cached is not None:
+            # Nearly the same crop was read moments ago: its plates for this frame, but no vote
+            pending.append((track, crop_fp, None, cached))
+            continue
+        with stage('preprocess'):
+            ocr_input = preprocessor.process(plate_img)
+        # All crops of this frame are read in parallel by the OCR pool
+        pending.append((track, crop_fp, submit_ocr(ocr_input), None))
+        tracker.count_ocr(True)
 
-    results = model(image)
     final_texts = []
+    for track, crop_fp, future, ocr_result in pending:
+        if future is not None:
+            with stage('ocr'):
+                ocr_result = future.result()
+            ocr_cache.put(crop_fp, ocr_result)
+        texts = [text for text in plate_texts(ocr_result) if is_probable_plate(text)]
+        final_texts.extend(texts)
+        if future is not None:
+            track.vote(texts, crop_fp)
+
+    if deadline is not None and time.monotonic() > deadline:
+        # The request has already been answered with a 504: do not act or log behind its back
+        raise InferenceTimeoutError("Recognition finished after its deadline")
+
     matched_texts = []
-    status = "пропуск заборонений"
+    status = DENIED_STATUS
     barrier_raised = False
+    for track in dict.fromkeys(tracks):
+        plate = track.plate
+        if plate is None or not (track.confirmed or config.TRACK_DECIDE_ON_FIRST_READ):
+            # No verdict until enough reads agree
+            continue
+        decision = track.decision_for(plate) if track.locked else None
+        if decision is not None:
+            allowed, corrected_plate = decision
+            changed = False
+            if plate not in final_texts:
+                final_texts.append(plate)
+        else:
+            # The lookup uses the track's consensus, not just this frame's reading
+            with stage('lookup'):
+                allowed, corrected_plate = is_plate_allowed(plate)
+            changed = track.decide(plate, allowed, corrected_plate)
+        matched_texts.append(corrected_plate)
+        if allowed:
+            status = ALLOWED_STATUS
+        if not changed:
+            # Same vehicle, same decision: no new log row or barrier command
+            continue
+        if config.DECISION_SHARED and not claim_decision(corrected_plate, allowed, lane):
+            # Another worker process already logged and acted on this vehicle
+            continue
+        if allowed and not track.barrier_raised:
+            # Automatically raise the barrier for allowed plates
+            with stage('barrier'):
+                get_barrier(lane).set_state('raised')
+            track.barrier_raised = True
+            barrier_raised = True
+        with stage('log'):
+            log_access(corrected_plate, ALLOWED_STATUS if allowed else DENIED_STATUS, lane)
 
-    # Draw rectangles for all detected plates
-    if results[0].boxes is not None:
-        boxes = results[0].boxes.xyxy.cpu().numpy()
-        for i, box in enumerate(boxes):
-            x1, y1, x2, y2 = map(int, box[:4])
-            # Draw rectangle (green by default)
-            cv2.rectangle(image, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            plate_img = image[y1:y2, x1:x2]
-
-            if plate_img is None or plate_img.shape[0] < 40 or plate_img.shape[1] < 100:
-                continue
-
-            resized = resize_for_ocr(plate_img)
-            processed = enhance_contrast(resized)
-            ocr_result = run_ocr(processed)
-
-            if ocr_result and len(ocr_result) > 0:
-                for line in ocr_result[0]:
-                    text = line[1][0]
-                    # Прибираємо ':' з номера
-                    text = text.replace(':', '')
-                    text = text.replace('=', '')
-                    text_cleaned = clean_ocr_text(text.replace(" ", "").upper())
-
-                    if is_probable_plate(text_cleaned):
-                        allowed, corrected_plate = is_plate_allowed(text_cleaned)
-                        final_texts.append(text_cleaned)
-                        matched_texts.append(corrected_plate)
-                        if allowed:
-                            status = "пропуск дозволений"
-                            # Automatically raise the barrier for allowed plates
-                            requests.post(f"http://localhost:5000/set_barrier", json={"state": "raised"})
-                            barrier_raised = True
-                        log_access(corrected_plate, status)
-
-    # Encode image with rectangles to base64
-    _, img_encoded = cv2.imencode('.jpg', image)
-    img_base64 = base64.b64encode(img_encoded).decode('utf-8')
-
-    return jsonify({
-        'plates': final_texts, 
-        'matched': matched_texts, 
+    return {
+        'plates': final_texts,
+        'matched': matched_texts,
         'status': status,
         'barrier_raised': barrier_raised,
-        'boxed_image': img_base64
-    })
-
-def update_plate_list(self):
-    res = requests.get(f"{SERVER_URL}/list_plates")
-    if res.status_code == 200:
-        plates = res.json().get("plates", [])
-        self.plate_list.delete(0, tk.END)
-        for plate in sorted(plates):
-            self.plate_list.insert(tk.END, plate)
+        'boxes': boxes,
+    }
+
+def draw_boxes(image, boxes):
+    for box in boxes:
+        # Draw rectangle (green by default)
+        cv2.rectangle(image, (box['x1'], box['y1']), (box['x2'], box['y2']), (0, 255, 0), 2)
+    return image
+
+def encode_boxed_image(image, boxes, max_width=None, quality=config.RESPONSE_JPEG_QUALITY):
+    if max_width and image.shape[1] > max_width:
+        scale = max_width / image.shape[1]
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        boxes = [dict(box, **{k: int(box[k] * scale) for k in ('x1', 'y1', 'x2', 'y2')})
+                 for box in boxes]
+    draw_boxes(image, boxes)
+    _, img_encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return base64.b64encode(img_encoded).decode('utf-8')
+
+def read_request_image(request):
+    # Raw JPEG/PNG body or multipart upload; base64-in-JSON kept for older clients
+    if request.mimetype.startswith('image/'):
+        image_data = request.get_data(cache=False)
+    elif 'image' in request.files:
+        image_data = request.files['image'].read()
     else:
-        messagebox.showerror("Помилка", "Не вдалося отримати список номерів")
-
-class ClientApp:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("Клієнт: Розпізнавання та доступ")
-        self.root.geometry("1000x700")
-        self.create_widgets()
-        self.bind_events()
-        self.update_plate_list() 
\ No newline at end of file
+        data = request.get_json()
+        if 'image' not in data:
+            return None
+        image_data = base64.b64decode(data['image'])
+    if not image_data:
+        return None
+    nparr = np.frombuffer(image_data, np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+def _request_option(request, name, default=None):
+    value = request.args.get(name) or request.form.get(name)
+    if value is None and request.is_json:
+        value = (request.get_json(silent=True) or {}).get(name)
+    return default if value is None else value
+
+def recognize_plate(request):
+    with stage('decode'):
+        image = read_request_image(request)
+    if image is None:
+        return jsonify({'error': 'No image provided'}), 400
+
+    mode = _request_option(request, 'response', config.RESPONSE_MODE)
+    if mode not in RESPONSE_MODES:
+        return jsonify({'error': f"response must be one of {', '.join(RESPONSE_MODES)}"}), 400
+    try:
+        quality = int(_request_option(request, 'quality', config.RESPONSE_JPEG_QUALITY))
+        max_width = int(_request_option(request, 'max_width', config.THUMBNAIL_MAX_WIDTH))
+    except ValueError:
+        return jsonify({'error': 'quality and max_width must be integers'}), 400
+    if not 0 <= quality <= 100:
+        return jsonify({'error': 'quality must be between 0 and 100'}), 400
+    if max_width <= 0:
+        return jsonify({'error': 'max_width must be positive'}), 400
+
+    try:
+        # Detection/OCR run on the inference threads; this thread only waits, up to the deadline
+        deadline = time.monotonic() + config.RECOGNIZE_TIMEOUT
+        result = inference_executor.run(process_frame, image, _request_option(request, 'lane'), deadline)
+    except InferenceBusyError:
+        return jsonify({'error': 'Recognition queue is full, try again later'}), 503, {'Retry-After': '1'}
+    except OCRBusyError:
+        return jsonify({'error': 'OCR is busy, try again later'}), 503, {'Retry-After': '1'}
+    except InferenceTimeoutError:
+        return jsonify({'error': 'Recognition timed out'}), 504
+
+    response = {
+        'plates': result['plates'],
+        'matched': result['matched'],
+        'status': result['status'],
+        'barrier_raised': result['barrier_raised'],
+    }
+    if mode != 'decision':
+        response['boxes'] = result['boxes']
+    with stage('encode'):
+        if mode == 'thumbnail':
+            response['boxed_image'] = encode_boxed_image(image, result['boxes'], max_width, quality)
+        elif mode == 'full':
+            response['boxed_image'] = encode_boxed_image(image, result['boxes'], quality=quality)
+        return jsonify(response)
@@ -0,0 +1,227 @@
+"""Log retention: keeps access_log and barrier_log in the main database small.
+
+Rows older than LOG_RETENTION_DAYS move out of the main database into one
+SQLite file per month under LOG_PARTITION_DIR (logs-YYYY-MM.db, same tables).
+Monthly partitions that ended more than LOG_ARCHIVE_AFTER_DAYS ago are
+compressed to logs-YYYY-MM.jsonl.gz and their .db removed; archives older than
+LOG_ARCHIVE_KEEP_DAYS are deleted (0 keeps them forever). Freed pages of the
+main database are returned to the filesystem with incremental VACUUM.
+
+The server runs this every LOG_RETENTION_INTERVAL seconds; it can also be
+run by hand or from cron:
+
+    python retention.py [--dry-run]
+"""
+import argparse
+import datetime
+import glob
+import gzip
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import config
+
+# Log tables and the columns copied into partitions and archives
+LOG_TABLES = {
+    'access_log': ('id', 'plate', 'status', 'timestamp', 'lane'),
+    'barrier_log': ('id', 'status', 'timestamp', 'lane'),
+}
+
+
+def _connect(path):
+    # Long timeout: the log writer and request threads share the database
+    return sqlite3.connect(path, timeout=30)
+
+
+def _month_end(year, month):
+    return datetime.date(year + month // 12, month % 12 + 1, 1)
+
+
+def _next_month(timestamp):
+    year, month = int(timestamp[:4]), int(timestamp[5:7])
+    return _month_end(year, month).strftime('%Y-%m-%d 00:00:00')
+
+
+def partition_path(month, directory=config.LOG_PARTITION_DIR):
+    return os.path.join(directory, f"logs-{month}.db")
+
+
+def _create_partition_tables(conn):
+    conn.execute("""CREATE TABLE IF NOT EXISTS part.access_log (
+        id INTEGER PRIMARY KEY, plate TEXT, status TEXT, timestamp DATETIME, lane TEXT)""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS part.barrier_log (
+        id INTEGER PRIMARY KEY, status TEXT, timestamp DATETIME, lane TEXT)""")
+    conn.execute("CREATE INDEX IF NOT EXISTS part.idx_access_log_timestamp ON access_log (timestamp, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS part.idx_barrier_log_timestamp ON barrier_log (timestamp, id)")
+
+
+def roll_over(table, cutoff, db_path=config.DB_PATH, directory=config.LOG_PARTITION_DIR,
+              batch=config.LOG_RETENTION_BATCH, dry_run=False):
+    """Moves rows older than cutoff into monthly partitions, batch rows per transaction."""
+    columns = ", ".join(LOG_TABLES[table])
+    moved = {}
+    conn = _connect(db_path)
+    try:
+        if dry_run:
+            rows = conn.execute(f"SELECT substr(timestamp, 1, 7), count(*) FROM {table} "
+                                f"WHERE timestamp < ? GROUP BY 1", (cutoff,)).fetchall()
+            return dict(rows)
+        while True:
+            row = conn.execute(f"SELECT min(timestamp) FROM {table} WHERE timestamp < ?",
+                               (cutoff,)).fetchone()
+            if row[0] is None:
+                break
+            month = row[0][:7]
+            end = min(cutoff, _next_month(row[0]))
+            os.makedirs(directory, exist_ok=True)
+            conn.execute("ATTACH DATABASE ? AS part", (partition_path(month, directory),))
+            try:
+                _create_partition_tables(conn)
+                while True:
+                    # Short transactions so the log writer is never blocked for long
+                    boundary = conn.execute(
+                        f"SELECT timestamp, id FROM {table} WHERE timestamp < ? "
+                        f"ORDER BY timestamp, id LIMIT 1 OFFSET ?", (end, batch - 1)).fetchone()
+                    where, params = "timestamp < ?", [end]
+                    if boundary is not None:
+                        where += " AND (timestamp, id) <= (?, ?)"
+                        params += list(boundary)
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.execute(f"INSERT OR IGNORE INTO part.{table} ({columns}) "
+                                 f"SELECT {columns} FROM main.{table} WHERE {where}", params)
+                    count = conn.execute(f"DELETE FROM main.{table} WHERE {where}", params).rowcount
+                    conn.commit()
+                    moved[month] = moved.get(month, 0) + count
+                    if boundary is None:
+                        break
+            finally:
+                conn.execute("DETACH DATABASE part")
+    finally:
+        conn.close()
+    return moved
+
+
+def archive_partition(path, dry_run=False):
+    """Writes a monthly partition to .jsonl.gz (one JSON object per row) and removes the .db."""
+    archive = path[:-len(".db")] + ".jsonl.gz"
+    if dry_run:
+        return archive
+    tmp = archive + ".tmp"
+    with _connect(path) as conn, gzip.open(tmp, 'wt', encoding='utf-8') as out:
+        for table, columns in LOG_TABLES.items():
+            rows = conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY timestamp, id")
+            for row in rows:
+                out.write(json.dumps(dict(zip(columns, row), table=table), ensure_ascii=False) + "\n")
+    conn.close()
+    if os.path.exists(archive):
+        # Rows that arrived for an already archived month: keep both files
+        archive = archive[:-len(".jsonl.gz")] + f"-{int(time.time())}.jsonl.gz"
+    os.replace(tmp, archive)
+    os.remove(path)
+    return archive
+
+
+def archive_and_expire(today, directory=config.LOG_PARTITION_DIR,
+                       archive_after_days=config.LOG_ARCHIVE_AFTER_DAYS,
+                       keep_days=config.LOG_ARCHIVE_KEEP_DAYS, dry_run=False):
+    archived, deleted = [], []
+    for path in sorted(glob.glob(os.path.join(directory, "logs-*"))):
+        name = os.path.basename(path)
+        match = re.match(r'logs-(\d{4})-(\d{2})', name)
+        if match is None:
+            continue
+        age = (today - _month_end(int(match.group(1)), int(match.group(2)))).days
+        if name.endswith(".db"):
+            if archive_after_days and age >= archive_after_days:
+                archived.append(archive_partition(path, dry_run))
+        elif name.endswith(".jsonl.gz"):
+            if keep_days and age >= keep_days:
+                if not dry_run:
+                    os.remove(path)
+                deleted.append(path)
+    return archived, deleted
+
+
+def ensure_incremental_vacuum(db_path=config.DB_PATH):
+    # auto_vacuum can only be switched on an existing database by one full VACUUM
+    with _connect(db_path) as conn:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            return True
+    return False
+
+
+def incremental_vacuum(db_path=config.DB_PATH):
+    conn = _connect(db_path)
+    try:
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        # execute() steps the pragma only once (one page); executescript runs it to completion
+        conn.executescript("PRAGMA incremental_vacuum;")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+    return free
+
+
+def run_retention(now=None, dry_run=False):
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    cutoff = (now - datetime.timedelta(days=config.LOG_RETENTION_DAYS)).strftime('%Y-%m-%d 00:00:00')
+    report = {'cutoff': cutoff}
+    if config.LOG_RETENTION_DAYS:
+        # Queued rows must be in the table before it is rolled over
+        from log_writer import get_log_writer
+        get_log_writer().flush()
+        report['moved'] = {table: roll_over(table, cutoff, dry_run=dry_run) for table in LOG_TABLES}
+    report['archived'], report['deleted'] = archive_and_expire(now.date(), dry_run=dry_run)
+    if not dry_run:
+        report['vacuum_enabled'] = ensure_incremental_vacuum()
+        report['freed_pages'] = incremental_vacuum()
+    return report
+
+
+class RetentionScheduler:
+    """Background thread that runs run_retention every interval seconds."""
+
+    def __init__(self, interval=config.LOG_RETENTION_INTERVAL):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval and self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="retention", daemon=True)
+            self._thread.start()
+
+    def run(self):
+        # Blocking loop; start() runs it on a background thread
+        while not self._stop.wait(self.interval):
+            try:
+                run_retention()
+            except (sqlite3.Error, OSError) as e:
+                # Try again next interval, e.g. when the database stayed locked
+                print(f"[retention] {e}")
+
+    def shutdown(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dry-run', action='store_true', help='report what would be moved and archived')
+    args = parser.parse_args()
+    from db import init_db
+    init_db()
+    print(json.dumps(run_retention(dry_run=args.dry_run), indent=2))
+    from log_writer import shutdown_log_writer
+    shutdown_log_writer()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Per-lane detection regions (ROI).
+
+A gate camera sees its lane in a fixed part of the frame, so the detector
+only needs to look there. Each lane's ROI is a rectangle in fractions of the
+frame width and height, read from the ROI_CONFIG JSON file:
+
+    {"gate-1": {"roi": [0.25, 0.4, 0.9, 1.0], "input_size": 320},
+     "default": {"roi": [0, 0.3, 1, 1], "adaptive": false}}
+
+"default" covers /recognize requests without a lane and lanes not listed.
+The ROI is cut from the full-resolution frame and scaled so that its longer
+side is input_size, into a rectangle of the ROI's own shape rather than a
+padded square. Without an input_size, the ROI is scaled like the whole frame
+would be at DETECTOR_INPUT_SIZE, so the detector sees plates at the same
+pixel scale: small and distant plates are kept while the work drops with
+the ROI area. Static exported graphs only take their own square size, and
+ignore this. Boxes are mapped back to frame coordinates, so the
+OCR crops come from the full-resolution frame.
+
+With adaptive on, a frame whose ROI holds no plate is searched once more in
+the ROI grown ROI_EXPAND times around its centre, at the same pixel scale.
+"""
+import json
+import threading
+import config
+
+FULL_FRAME = (0.0, 0.0, 1.0, 1.0)
+DEFAULT_LANE = 'default'
+# YOLO input sides are multiples of its largest stride
+STRIDE = 32
+MIN_INPUT_SIDE = 64
+
+
+def _input_shape(density, x1, y1, x2, y2):
+    # (height, width) of the detector input for a window at this many input pixels per frame pixel
+    return tuple(max(MIN_INPUT_SIDE, round(density * side / STRIDE) * STRIDE) for side in (y2 - y1, x2 - x1))
+
+
+class LaneROI:
+    def __init__(self, region=FULL_FRAME, input_size=None, adaptive=config.ROI_ADAPTIVE,
+                 expand=config.ROI_EXPAND):
+        x1, y1, x2, y2 = map(float, region)
+        if not (0 <= x1 < x2 <= 1 and 0 <= y1 < y2 <= 1):
+            raise ValueError(f"ROI must be [x1, y1, x2, y2] fractions with x1 < x2 and y1 < y2, got {region}")
+        self.region = (x1, y1, x2, y2)
+        self.input_size = input_size
+        self.adaptive = bool(adaptive) and self.region != FULL_FRAME
+        self.expand = expand
+        self._lock = threading.Lock()
+        self._frames = 0
+        self._expanded = 0
+        self._expanded_hits = 0
+
+    def _grown(self):
+        x1, y1, x2, y2 = self.region
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        half_w, half_h = (x2 - x1) * self.expand / 2, (y2 - y1) * self.expand / 2
+        return max(0.0, cx - half_w), max(0.0, cy - half_h), min(1.0, cx + half_w), min(1.0, cy + half_h)
+
+    @staticmethod
+    def _pixels(region, shape):
+        h, w = shape[:2]
+        x1, y1 = int(region[0] * w), int(region[1] * h)
+        return x1, y1, max(x1 + 1, round(region[2] * w)), max(y1 + 1, round(region[3] * h))
+
+    def windows(self, shape):
+        """Pixel windows to search in a frame of this shape, in order.
+
+        Each is ((x1, y1, x2, y2), input_shape), where input_shape is the
+        (height, width) the window is letterboxed to, or None for the
+        detector's own square input.
+        """
+        roi = self._pixels(self.region, shape)
+        if not self.input_size and self.region == FULL_FRAME:
+            # The whole frame at the detector's own size, as without an ROI
+            yield roi, None
+            return
+        # Detector input pixels per frame pixel, kept the same for the grown window
+        if self.input_size:
+            density = self.input_size / max(roi[2] - roi[0], roi[3] - roi[1])
+        else:
+            density = config.DETECTOR_INPUT_SIZE / max(shape[:2])
+        yield roi, _input_shape(density, *roi)
+        if self.adaptive:
+            grown = self._pixels(self._grown(), shape)
+            yield grown, _input_shape(density, *grown)
+
+    def count(self, attempt, found):
+        with self._lock:
+            if attempt == 0:
+                self._frames += 1
+            else:
+                self._expanded += 1
+                self._expanded_hits += bool(found)
+
+    def stats(self):
+        with self._lock:
+            return {'region': list(self.region), 'input_size': self.input_size, 'adaptive': self.adaptive,
+                    'frames': self._frames, 'expanded': self._expanded,
+                    'expanded_hits': self._expanded_hits}
+
+
+def load_rois(path=config.ROI_CONFIG):
+    rois = {}
+    if path:
+        with open(path, encoding='utf-8') as f:
+            for lane, entry in json.load(f).items():
+                rois[lane] = LaneROI(entry.get('roi', FULL_FRAME), entry.get('input_size'),
+                                     entry.get('adaptive', config.ROI_ADAPTIVE),
+                                     entry.get('expand', config.ROI_EXPAND))
+    rois.setdefault(DEFAULT_LANE, LaneROI())
+    return rois
+
+
+_rois = None
+_rois_lock = threading.Lock()
+
+
+def get_lane_roi(lane=None):
+    global _rois
+    with _rois_lock:
+        if _rois is None:
+            _rois = load_rois()
+        return _rois.get(lane or DEFAULT_LANE, _rois[DEFAULT_LANE])
+
+
+def roi_stats():
+    get_lane_roi()
+    with _rois_lock:
+        rois = dict(_rois)
+    return {lane: roi.stats() for lane, roi in rois.items()}
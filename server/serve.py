@@ -0,0 +1,144 @@
+"""Production serving: pre-forked worker processes sharing one listening socket.
+
+    python serve.py [--workers 4] [--host 0.0.0.0] [--port 5000]
+
+The master prepares the database, opens the socket and forks the workers;
+it restarts any worker that dies. Each worker loads and warms its own
+detector and OCR engine before it starts accepting connections, then serves
+the Flask app with a threaded WSGI server. Barrier state and the allowlist
+are shared through SQLite, so all workers agree on both. One more child
+runs log retention every LOG_RETENTION_INTERVAL seconds.
+
+Plate tracking and OCR voting stay per worker: frames from one camera are
+spread over the workers, and each one settles the plate on the frames it
+sees. The verdicts meet in SQLite (lane_decisions): the first worker to
+reach one logs it and raises the barrier, the others skip it for
+DECISION_DEDUPE_WINDOW seconds (DECISION_SHARED, on by default here). Lowering
+the barrier through /set_barrier releases the lane's claims. Per-worker tracking costs some extra OCR
+reads compared with one process, not extra log rows.
+
+`python app.py` still runs the single-process development server.
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+
+# One OCR engine per worker process unless configured otherwise, and verdicts claimed across
+# the workers; set before config is imported
+os.environ.setdefault("OCR_POOL_SIZE", "1")
+os.environ.setdefault("DECISION_SHARED", "1")
+
+import config
+
+
+def run_worker(sock, host, port):
+    from werkzeug.serving import make_server
+    from app import app
+    from recognition import warmup
+    from ocr import shutdown_ocr
+    from log_writer import shutdown_log_writer
+    from inference import inference_executor
+
+    def stop(signum, frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    # Warm before serving: a worker only accepts connections once its models are loaded
+    warmup()
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    try:
+        server.serve_forever()
+    finally:
+        # In-flight frames finish first, while OCR and the log writer are still up
+        inference_executor.shutdown()
+        shutdown_ocr()
+        shutdown_log_writer()
+
+
+def run_retention():
+    from retention import RetentionScheduler
+    from log_writer import shutdown_log_writer
+
+    def stop(signum, frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        RetentionScheduler().run()
+    finally:
+        shutdown_log_writer()
+
+
+def spawn(target, *args):
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            target(*args)
+        except SystemExit as e:
+            code = e.code or 0
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default=config.SERVE_HOST)
+    parser.add_argument('--port', type=int, default=config.SERVE_PORT)
+    parser.add_argument('--workers', type=int, default=config.SERVE_WORKERS or os.cpu_count())
+    args = parser.parse_args()
+
+    from db import init_db
+    # Migrate once here instead of racing in every worker
+    init_db()
+    # Imported before forking so the workers share the loaded modules copy-on-write
+    import app  # noqa: F401
+
+    sock = socket.create_server((args.host, args.port), backlog=128)
+    sock.set_inheritable(True)
+    children = [(run_worker, (sock, args.host, args.port))] * args.workers
+    if config.LOG_RETENTION_INTERVAL:
+        # One process for log retention, so the workers never run it concurrently
+        children.append((run_retention, ()))
+    workers = {spawn(target, *target_args): (target, target_args) for target, target_args in children}
+    print(f"Serving on {args.host}:{args.port} with {args.workers} workers", flush=True)
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        target, target_args = workers.pop(pid, (None, None))
+        if not stopping and target is not None:
+            print(f"Worker {pid} exited with status {status}, restarting", file=sys.stderr, flush=True)
+            # Do not spin if a worker dies straight away, e.g. on a missing model
+            time.sleep(1)
+            workers[spawn(target, *target_args)] = (target, target_args)
+    sock.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+import time
+from contextlib import contextmanager
+
+# Callables taking (stage name, seconds); the replay benchmark and /metrics subscribe here
+_observers = []
+
+
+def add_observer(observer):
+    _observers.append(observer)
+
+
+def remove_observer(observer):
+    _observers.remove(observer)
+
+
+@contextmanager
+def stage(name):
+    """Times the enclosed block as one pipeline stage and reports it to the observers."""
+    if not _observers:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        for observer in _observers:
+            observer(name, elapsed)
@@ -0,0 +1,272 @@
+"""Multi-lane stream ingestion: feeds camera streams straight into the recognition pipeline.
+
+Each lane is a video source (RTSP/MJPEG URL, video file or local camera index).
+Lanes are spread round-robin over worker processes, one per CPU core by
+default; every worker loads its own detector/OCR and pins itself to a core.
+
+    python streams.py --lane gate-1=rtsp://cam1/stream --lane gate-2=videos/lane2.mp4
+    python streams.py --config streams.json --workers 2
+
+streams.json: [{"lane": "gate-1", "source": "rtsp://..."}, ...]
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+
+import cv2
+import config
+
+
+def parse_source(source):
+    return int(source) if str(source).isdigit() else source
+
+
+class LaneStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.decoded = 0
+        self.processed = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_error = None
+        self.latencies = deque(maxlen=500)
+
+    def record(self, latency):
+        with self._lock:
+            self.processed += 1
+            self.latencies.append(latency)
+
+    def record_error(self, error):
+        with self._lock:
+            self.errors += 1
+            self.last_error = repr(error)
+
+    def snapshot(self):
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            latencies = sorted(self.latencies)
+        return {
+            'decode_fps': self.decoded / elapsed if elapsed else 0.0,
+            'process_fps': self.processed / elapsed if elapsed else 0.0,
+            'skipped_frames': self.skipped,
+            'errors': self.errors,
+            'last_error': self.last_error,
+            'latency_avg_ms': sum(latencies) / len(latencies) * 1000 if latencies else None,
+            'latency_p95_ms': latencies[int(len(latencies) * 0.95)] * 1000 if latencies else None,
+        }
+
+
+class Lane:
+    """One video source: a decode thread keeps only the newest frame, a
+    process thread runs it through process_frame with the lane's barrier."""
+
+    def __init__(self, name, source, realtime=True, loop=False):
+        self.name = name
+        self.source = parse_source(source)
+        self.realtime = realtime
+        self.loop = loop
+        self.stats = LaneStats()
+        self._frame = None
+        self._cond = threading.Condition()
+        self._running = threading.Event()
+        self._finished = False
+        self._raised_at = None
+
+    def start(self):
+        self._running.set()
+        self._threads = [
+            threading.Thread(target=self._decode, name=f"{self.name}-decode", daemon=True),
+            threading.Thread(target=self._process, name=f"{self.name}-process", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._running.clear()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    def _decode(self):
+        is_file = isinstance(self.source, str) and os.path.isfile(self.source)
+        while self._running.is_set():
+            cap = cv2.VideoCapture(self.source)
+            if not cap.isOpened():
+                time.sleep(config.STREAM_RECONNECT_DELAY)
+                continue
+            interval = 1 / (cap.get(cv2.CAP_PROP_FPS) or 25) if self.realtime and is_file else 0
+            while self._running.is_set():
+                started = time.monotonic()
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                with self._cond:
+                    if self._frame is not None:
+                        # The previous frame was never picked up: the pipeline is behind
+                        self.stats.skipped += 1
+                    self._frame = (time.monotonic(), frame)
+                    self.stats.decoded += 1
+                    self._cond.notify()
+                if interval:
+                    time.sleep(max(0, interval - (time.monotonic() - started)))
+            cap.release()
+            if is_file and not self.loop:
+                break
+            if not is_file:
+                time.sleep(config.STREAM_RECONNECT_DELAY)
+        with self._cond:
+            self._finished = True
+            self._cond.notify_all()
+
+    def _process(self):
+        from barrier import get_barrier
+        from recognition import process_frame
+
+        barrier = get_barrier(self.name)
+        while self._running.is_set():
+            with self._cond:
+                self._cond.wait_for(lambda: self._frame is not None or self._finished
+                                    or not self._running.is_set())
+                if self._frame is None:
+                    break
+                decoded_at, frame = self._frame
+                self._frame = None
+            try:
+                result = process_frame(frame, lane=self.name)
+            except Exception as e:
+                # A busy OCR queue or a locked database costs this frame, not the lane
+                self.stats.record_error(e)
+                print(f"Lane {self.name}: frame failed: {e!r}", file=sys.stderr, flush=True)
+                continue
+            self.stats.record(time.monotonic() - decoded_at)
+            now = time.monotonic()
+            if result['barrier_raised']:
+                self._raised_at = now
+            elif self._raised_at and now - self._raised_at >= config.LANE_BARRIER_HOLD:
+                # No operator on a stream lane, so the barrier comes down on its own
+                barrier.set_state('lowered')
+                self._raised_at = None
+
+    @property
+    def finished(self):
+        return self._finished and self._frame is None
+
+    def snapshot(self):
+        from barrier import get_barrier
+        stats = self.stats.snapshot()
+        stats['barrier'] = get_barrier(self.name).state
+        return stats
+
+
+def run_worker(lanes, cpus, stats_queue, stop_event, realtime, loop):
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+    from db import init_db
+    init_db()
+
+    running = [Lane(name, source, realtime, loop) for name, source in lanes]
+    for lane in running:
+        lane.start()
+    while not stop_event.is_set() and not all(lane.finished for lane in running):
+        stop_event.wait(config.STREAM_STATS_INTERVAL)
+        stats_queue.put({lane.name: lane.snapshot() for lane in running})
+    for lane in running:
+        lane.stop()
+    stats_queue.put({lane.name: lane.snapshot() for lane in running})
+
+    from log_writer import shutdown_log_writer
+    shutdown_log_writer()
+
+
+def assign_lanes(lanes, workers):
+    groups = [[] for _ in range(min(workers, len(lanes)))]
+    for i, lane in enumerate(lanes):
+        groups[i % len(groups)].append(lane)
+    return groups
+
+
+def assign_cpus(workers):
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else []
+    if len(cpus) < workers:
+        return [None] * workers
+    per_worker = len(cpus) // workers
+    return [set(cpus[i * per_worker:(i + 1) * per_worker]) for i in range(workers)]
+
+
+def print_stats(stats):
+    print(f"{'lane':<12} {'decode fps':>10} {'proc fps':>9} {'skipped':>8} "
+          f"{'lat avg ms':>10} {'lat p95 ms':>10} {'errors':>7} {'barrier':>8}")
+    for name, lane in sorted(stats.items()):
+        avg = f"{lane['latency_avg_ms']:.0f}" if lane['latency_avg_ms'] is not None else "-"
+        p95 = f"{lane['latency_p95_ms']:.0f}" if lane['latency_p95_ms'] is not None else "-"
+        print(f"{name:<12} {lane['decode_fps']:>10.1f} {lane['process_fps']:>9.1f} "
+              f"{lane['skipped_frames']:>8} {avg:>10} {p95:>10} {lane['errors']:>7} {lane['barrier']:>8}")
+
+
+def load_lanes(args):
+    lanes = []
+    if args.config:
+        with open(args.config) as f:
+            lanes += [(entry['lane'], entry['source']) for entry in json.load(f)]
+    for spec in args.lane:
+        name, _, source = spec.partition('=')
+        if not source:
+            raise SystemExit(f"--lane expects NAME=SOURCE, got {spec!r}")
+        lanes.append((name, source))
+    if not lanes:
+        raise SystemExit("No lanes given, use --lane NAME=SOURCE or --config FILE")
+    return lanes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lane', action='append', default=[], metavar='NAME=SOURCE')
+    parser.add_argument('--config', help='JSON list of {"lane": ..., "source": ...}')
+    parser.add_argument('--workers', type=int, default=config.STREAM_WORKERS or os.cpu_count())
+    parser.add_argument('--no-realtime', dest='realtime', action='store_false',
+                        help='decode files as fast as possible instead of at their frame rate')
+    parser.add_argument('--loop', action='store_true', help='restart video files when they end')
+    parser.add_argument('--stats-file', help='write the latest per-lane stats here as JSON')
+    args = parser.parse_args()
+
+    groups = assign_lanes(load_lanes(args), args.workers)
+    cpus = assign_cpus(len(groups))
+    stats_queue = mp.Queue()
+    stop_event = mp.Event()
+    workers = [mp.Process(target=run_worker, name=f"lanes-{i}",
+                          args=(group, cpus[i], stats_queue, stop_event, args.realtime, args.loop))
+               for i, group in enumerate(groups)]
+    for worker in workers:
+        worker.start()
+
+    stats = {}
+    try:
+        while any(worker.is_alive() for worker in workers):
+            try:
+                stats.update(stats_queue.get(timeout=config.STREAM_STATS_INTERVAL))
+            except queue.Empty:
+                continue
+            print_stats(stats)
+            if args.stats_file:
+                with open(args.stats_file, 'w') as f:
+                    json.dump(stats, f, indent=2)
+    except KeyboardInterrupt:
+        stop_event.set()
+    for worker in workers:
+        worker.join()
+    while not stats_queue.empty():
+        stats.update(stats_queue.get())
+    if stats:
+        print_stats(stats)
+
+
+if __name__ == '__main__':
+    main()
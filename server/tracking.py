@@ -0,0 +1,189 @@
+import itertools
+import threading
+import time
+from collections import Counter
+from ocr_cache import similar
+import config
+
+
+def iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def center_shift(a, b):
+    # Distance between box centres relative to the width of the older box
+    dx = (a[0] + a[2] - b[0] - b[2]) / 2
+    dy = (a[1] + a[3] - b[1] - b[3]) / 2
+    width = max(1, b[2] - b[0])
+    return (dx * dx + dy * dy) ** 0.5 / width
+
+
+class Track:
+    """One plate followed across frames, with an OCR vote per read string.
+
+    Tracks are matched by position only, so the next car stopping in the
+    same place lands on the same track. A locked track therefore skips OCR
+    only while its crop still looks like the one its plate was last read
+    from, and for at most TRACK_LOCK_TTL seconds; otherwise the crop is read
+    again. A read that disagrees with a locked plate means another vehicle:
+    the votes start over, and the new decision is logged.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, box, now):
+        self.id = next(self._ids)
+        self.box = box
+        self.last_seen = now
+        self.votes = Counter()
+        self.decision = None
+        self.decided_read = None
+        self.barrier_raised = False
+        self.reference = None
+        self.verified_at = None
+        self._lock = threading.Lock()
+
+    def _confirmed(self):
+        return bool(self.votes) and self.votes.most_common(1)[0][1] >= config.TRACK_CONFIRM_VOTES
+
+    def _locked(self, now):
+        return (self._confirmed() and self.verified_at is not None
+                and now - self.verified_at <= config.TRACK_LOCK_TTL)
+
+    def needs_ocr(self, fp, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if not self._locked(now) or self.reference is None or not similar(fp, self.reference):
+                return True
+            # Follows the plate as it moves and grows in the frame
+            self.reference = fp
+            return False
+
+    def vote(self, texts, fp, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._confirmed() and texts and self.votes.most_common(1)[0][0] not in texts:
+                # Read as something else: another vehicle in the same place
+                self.votes = Counter()
+                self.verified_at = None
+            self.votes.update(texts)
+            if self._confirmed() and self.votes.most_common(1)[0][0] in texts:
+                self.verified_at = now
+                self.reference = fp
+
+    @property
+    def plate(self):
+        with self._lock:
+            return self.votes.most_common(1)[0][0] if self.votes else None
+
+    @property
+    def confirmed(self):
+        # Enough agreeing reads for a verdict
+        with self._lock:
+            return self._confirmed()
+
+    @property
+    def locked(self):
+        # Enough agreeing reads, recently confirmed: no more OCR or lookups for this track
+        with self._lock:
+            return self._locked(time.monotonic())
+
+    def decision_for(self, read):
+        # The verdict reached on this consensus read, if it is the one decided on
+        with self._lock:
+            return self.decision if self.decided_read == read else None
+
+    def decide(self, read, allowed, plate):
+        # True when the decision is new or changed, i.e. when it should be logged
+        with self._lock:
+            self.decided_read = read
+            changed = self.decision != (allowed, plate)
+            if changed:
+                # A different plate may open the barrier again
+                self.barrier_raised = False
+            self.decision = (allowed, plate)
+            return changed
+
+    def forget_decision(self):
+        # The next verdict on this track is logged and acted on as new
+        with self._lock:
+            self.decision = None
+            self.decided_read = None
+            self.barrier_raised = False
+
+
+class PlateTracker:
+    """Associates detections with tracks by IoU, falling back to centre distance."""
+
+    def __init__(self, iou_threshold=config.TRACK_IOU, max_shift=config.TRACK_MAX_SHIFT,
+                 ttl=config.TRACK_TTL):
+        self.iou_threshold = iou_threshold
+        self.max_shift = max_shift
+        self.ttl = ttl
+        self._tracks = []
+        self._lock = threading.Lock()
+        self.ocr_runs = 0
+        self.ocr_skipped = 0
+
+    def update(self, boxes, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._tracks = [t for t in self._tracks if now - t.last_seen <= self.ttl]
+            pairs = sorted(((iou(box, t.box), i, t) for i, box in enumerate(boxes)
+                            for t in self._tracks), key=lambda p: p[0], reverse=True)
+            assigned, used = {}, set()
+            for score, i, track in pairs:
+                if i in assigned or track.id in used:
+                    continue
+                if score >= self.iou_threshold or center_shift(boxes[i], track.box) <= self.max_shift:
+                    assigned[i] = track
+                    used.add(track.id)
+            result = []
+            for i, box in enumerate(boxes):
+                track = assigned.get(i)
+                if track is None:
+                    track = Track(box, now)
+                    self._tracks.append(track)
+                track.box = box
+                track.last_seen = now
+                result.append(track)
+            return result
+
+    def forget_decisions(self):
+        with self._lock:
+            tracks = list(self._tracks)
+        for track in tracks:
+            track.forget_decision()
+
+    def count_ocr(self, ran):
+        with self._lock:
+            if ran:
+                self.ocr_runs += 1
+            else:
+                self.ocr_skipped += 1
+
+    def stats(self):
+        with self._lock:
+            return {'active_tracks': len(self._tracks), 'ocr_runs': self.ocr_runs,
+                    'ocr_skipped': self.ocr_skipped}
+
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+
+def get_tracker(lane=None):
+    with _trackers_lock:
+        if lane not in _trackers:
+            _trackers[lane] = PlateTracker()
+        return _trackers[lane]
+
+
+def tracker_stats():
+    with _trackers_lock:
+        trackers = dict(_trackers)
+    return {lane or 'default': tracker.stats() for lane, tracker in trackers.items()}